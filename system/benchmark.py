@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks the simulation engine on synthetic OD tables of increasing size.
+
+Run from the system directory, e.g.
+
+    python benchmark.py --scales mn ctu --output benchmark.json
+    python benchmark.py --baseline benchmark.json --output candidate.json
+
+Every case runs in a fresh process, so the reported peak RSS belongs to that
+case alone. When a baseline is given, each case is compared against it and the
+script exits with a non-zero status if throughput or memory regressed by more
+than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from pandas import DataFrame
+from typing import Dict, List
+
+from metrics import MetricsMonitor, Monitor, peak_rss_mb
+from model import MODEL_FIELDS, Simulation
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+# Synthetic OD Table Shapes as (Cities, Nearest Neighbours)
+SCALES = {
+    "mn": (900, 100),
+    "ctu": (2700, 100),
+    "multistate": (20000, 100),
+}
+
+
+def synthetic_od(num_cities: int, k: int, seed=0, presence_rate=0.05) -> DataFrame:
+    """Generates an OD table shaped like the notebook's `merged_df`.
+
+    Cities are scattered uniformly over a 600 km square (roughly the extent of
+    Minnesota) and linked to their `k` nearest neighbours, with log-normal
+    weights and a share of origins with BMSB presence.
+
+    :param int num_cities: Number of cities
+    :param int k: Number of nearest neighbours each city is linked to
+    :param int seed: Seed for the random number generator, defaults to 0
+    :param float presence_rate: Share of cities with BMSB presence, defaults to 0.05
+    :return DataFrame: OD table with the default `Simulation` field names
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, num_cities - 1)
+
+    xy = rng.random((num_cities, 2)) * 600000
+    weight = rng.lognormal(0, 1, num_cities)
+    presence = (rng.random(num_cities) < presence_rate).astype(np.int64)
+    names = np.array([f"City {i}" for i in range(num_cities)], dtype=object)
+
+    # Find Nearest Neighbours in Chunks to Keep the Distance Matrix Small
+    neighbours = np.empty((num_cities, k), dtype=np.int64)
+    distance = np.empty((num_cities, k))
+    chunk_size = max(1, 2**22 // num_cities)
+
+    for start in range(0, num_cities, chunk_size):
+        stop = min(start + chunk_size, num_cities)
+        d = np.hypot(
+            xy[start:stop, 0, np.newaxis] - xy[:, 0],
+            xy[start:stop, 1, np.newaxis] - xy[:, 1],
+        )
+        d[np.arange(stop - start), np.arange(start, stop)] = np.inf
+
+        nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+        neighbours[start:stop] = nearest
+        distance[start:stop] = np.take_along_axis(d, nearest, axis=1)
+
+    origin = np.repeat(np.arange(num_cities), k)
+    destination = neighbours.ravel()
+
+    return pd.DataFrame(
+        {
+            "Distance": distance.ravel(),
+            "City: From": names[origin],
+            "W: From": weight[origin],
+            "BMSB Presence: From": presence[origin],
+            "City: To": names[destination],
+            "W: To": weight[destination],
+            "BMSB Presence: To": 0,
+        }
+    )
+
+
+def run_case(case: Dict) -> Dict:
+    """Runs a single benchmark case and measures it.
+
+    The kernel is warmed up in this process beforehand, so compilation is not
+    timed. Worker pools are started and warmed up within the timed run, and
+    the warm-up time summed across workers is reported as `warmup_seconds`.
+
+    :param Dict case: Case description with scale, model, engine, workers, num_sims & replicates
+    :return Dict: Case description with timings and peak RSS added
+    """
+    num_cities, k = SCALES[case["scale"]]
+    df = synthetic_od(num_cities, k, case["seed"])
+
+    # Time Graph Compilation Separately from the Simulation
+    start = time.perf_counter()
+    sim = Simulation(df, backend=case["backend"])
+    setup = time.perf_counter() - start
+
+    # Warm Up so Compilation & First-Touch Costs are not Timed
+    sim.monte_carlo_cities(case["model"], 1, True, seed=case["seed"], monitor=Monitor())
+
+    monitor = MetricsMonitor()
+    start = time.perf_counter()
+
+    if case["replicates"] is None:
+        sim.monte_carlo(
+            case["model"],
+            case["num_sims"],
+            True,
+            case["engine"],
+            seed=case["seed"],
+            monitor=monitor,
+        )
+        total_sims = case["num_sims"]
+    else:
+        sim.monte_carlo_batch(
+            case["model"],
+            case["num_sims"],
+            case["replicates"],
+            True,
+            seed=case["seed"],
+            workers=case["workers"],
+            monitor=monitor,
+        )
+        total_sims = case["num_sims"] * case["replicates"]
+
+    seconds = time.perf_counter() - start
+
+    return {
+        **case,
+        "backend": sim.backend,
+        "cities": sim.graph.num_cities,
+        "edges": sim.graph.num_edges,
+        "setup_seconds": setup,
+        "warmup_seconds": monitor.timings.get("warmup", 0.0),
+        "seconds": seconds,
+        "sims_per_sec": total_sims / seconds,
+        "rng_draws": monitor.draws,
+        "phases": monitor.timings,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def build_cases(
+    scales: List[str],
+    models: List[str],
+    engines: List[str],
+    workers: List[int],
+    num_sims: int,
+    replicates: int,
+    backend: str,
+    seed: int,
+) -> List[Dict]:
+    """Lists the benchmark cases to run.
+
+    Each scale gets a single-chain `monte_carlo` case per model and engine, and
+    a `monte_carlo_batch` case per worker count for the first model.
+
+    :return List[Dict]: Case descriptions
+    """
+    cases = []
+
+    for scale in scales:
+        for model in models:
+            for engine in engines:
+                cases.append(
+                    {
+                        "name": f"{scale}/{model}/monte_carlo/{engine}",
+                        "scale": scale,
+                        "model": model,
+                        "engine": engine,
+                        "workers": 1,
+                        "num_sims": num_sims,
+                        "replicates": None,
+                        "backend": backend,
+                        "seed": seed,
+                    }
+                )
+
+        for n in workers:
+            cases.append(
+                {
+                    "name": f"{scale}/{models[0]}/monte_carlo_batch/workers-{n}",
+                    "scale": scale,
+                    "model": models[0],
+                    "engine": "numpy",
+                    "workers": n,
+                    "num_sims": num_sims,
+                    "replicates": replicates,
+                    "backend": backend,
+                    "seed": seed,
+                }
+            )
+
+    return cases
+
+
+def apply_thresholds(results: List[Dict], baseline: Dict, tolerance: float) -> bool:
+    """Sets regression thresholds from a baseline and checks each result against them.
+
+    A case regresses when its throughput falls below, or its peak RSS rises
+    above, the baseline by more than the tolerance. Cases missing from the
+    baseline have no thresholds and always pass.
+
+    :param List[Dict] results: Measured cases, updated in place
+    :param Dict baseline: Output of a previous benchmark run
+    :param float tolerance: Allowed relative regression, e.g. 0.2 for 20%
+    :return bool: Whether every case passed
+    """
+    previous = {r["name"]: r for r in baseline["results"]}
+    passed = True
+
+    for result in results:
+        base = previous.get(result["name"])
+
+        if base is None:
+            result["thresholds"] = None
+            result["passed"] = True
+            continue
+
+        thresholds = {"min_sims_per_sec": base["sims_per_sec"] * (1 - tolerance)}
+
+        if base["peak_rss_mb"] is not None and result["peak_rss_mb"] is not None:
+            thresholds["max_peak_rss_mb"] = base["peak_rss_mb"] * (1 + tolerance)
+
+        result["thresholds"] = thresholds
+        result["passed"] = result["sims_per_sec"] >= thresholds["min_sims_per_sec"]
+
+        if "max_peak_rss_mb" in thresholds:
+            result["passed"] &= result["peak_rss_mb"] <= thresholds["max_peak_rss_mb"]
+
+        passed = passed and result["passed"]
+
+    return passed
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", default=["mn", "ctu"], choices=SCALES)
+    parser.add_argument(
+        "--models", nargs="+", default=list(MODEL_FIELDS), choices=MODEL_FIELDS
+    )
+    parser.add_argument(
+        "--engines", nargs="+", default=["numpy"], choices=["pandas", "numpy"]
+    )
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--num-sims", type=int, default=100)
+    parser.add_argument("--replicates", type=int, default=64)
+    parser.add_argument("--backend", default="auto")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", help="Previous output to set thresholds from")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    cases = build_cases(
+        args.scales,
+        args.models,
+        args.engines,
+        args.workers,
+        args.num_sims,
+        args.replicates,
+        args.backend,
+        args.seed,
+    )
+
+    # Run Each Case in a Fresh Process so Peak RSS is Measured per Case
+    results = []
+
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+            result = ex.submit(run_case, case).result()
+
+        results.append(result)
+        print(
+            f"{result['name']:<55} {result['sims_per_sec']:>12.1f} sims/s"
+            f" {result['peak_rss_mb'] or float('nan'):>10.1f} MB"
+        )
+
+    # Compare Against Baseline
+    passed = True
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            passed = apply_thresholds(results, json.load(f), args.tolerance)
+
+    output = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "baseline": args.baseline,
+        "tolerance": args.tolerance,
+        "passed": passed,
+        "results": results,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+
+    if not passed:
+        for result in results:
+            if not result["passed"]:
+                print(f"Regression: {result['name']}", file=sys.stderr)
+
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Saves and restores the state of long-running simulations."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from numpy import ndarray
+from numpy.random import Generator
+from os import PathLike
+from typing import List
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+
+class Checkpoint:
+    """
+    A class used to represent the state of a simulation between two steps.
+
+    Methods
+    -------
+    capture(step, rng, presence, end_presence, transition_cnt, models, fingerprint)
+        Class method. Copies the current state of a simulation.
+    fingerprint(probability)
+        Static method. Hashes the probabilities a simulation is run with.
+    load(path)
+        Class method. Reads a checkpoint from disk.
+    save(path)
+        Writes the checkpoint to disk, replacing any previous file atomically.
+    generator()
+        Recreates the random number generator at the saved position.
+
+    Example
+    -------
+    > fingerprint = Checkpoint.fingerprint(probability)
+    > checkpoint = Checkpoint.capture(step, rng, presence, end_presence, transition_cnt, ["HUFF_MODEL"], fingerprint)
+    > checkpoint.save("/path/to/run.ckpt.npz")
+    > rng = Checkpoint.load("/path/to/run.ckpt.npz").generator()
+    """
+
+    def __init__(
+        self,
+        step: int,
+        rng_state: dict,
+        presence: ndarray,
+        end_presence: ndarray,
+        transition_cnt: ndarray,
+        models: List[str],
+        fingerprint: str,
+    ) -> None:
+        """Initializes the Checkpoint class.
+
+        :param int step: Number of simulation steps completed
+        :param dict rng_state: State of the random number generator's bit generator
+        :param ndarray presence: Starting presence of each chain and city
+        :param ndarray end_presence: End presence of each chain and city
+        :param ndarray transition_cnt: Transition counts of each chain and edge
+        :param List[str] models: Models run by the chains, in chain order
+        :param str fingerprint: Fingerprint of the probabilities, from `fingerprint`
+        """
+        self.step = step
+        self.rng_state = rng_state
+        self.presence = presence
+        self.end_presence = end_presence
+        self.transition_cnt = transition_cnt
+        self.models = models
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def capture(
+        cls,
+        step: int,
+        rng: Generator,
+        presence: ndarray,
+        end_presence: ndarray,
+        transition_cnt: ndarray,
+        models: List[str],
+        fingerprint: str,
+    ) -> Checkpoint:
+        """Copies the current state of a simulation.
+
+        :param int step: Number of simulation steps completed
+        :param Generator rng: Random number generator used for the draws
+        :param ndarray presence: Starting presence of each chain and city
+        :param ndarray end_presence: End presence of each chain and city
+        :param ndarray transition_cnt: Transition counts of each chain and edge
+        :param List[str] models: Models run by the chains, in chain order
+        :param str fingerprint: Fingerprint of the probabilities, from `fingerprint`
+        :return Checkpoint: Snapshot of the simulation
+        """
+        return cls(
+            step,
+            rng.bit_generator.state,
+            presence.copy(),
+            end_presence.copy(),
+            transition_cnt.copy(),
+            list(models),
+            fingerprint,
+        )
+
+    @staticmethod
+    def fingerprint(probability: ndarray) -> str:
+        """Hashes the probabilities a simulation is run with.
+
+        A run can only be resumed with bit-identical probabilities, so a changed
+        table, model setting or `increase_prob` is caught before it is mixed in.
+
+        :param ndarray probability: Transition probabilities of each chain and edge
+        :return str: Hex digest of the probabilities
+        """
+        probability = np.ascontiguousarray(probability, dtype=float)
+        digest = hashlib.sha256(str(probability.shape).encode())
+        digest.update(probability.tobytes())
+        return digest.hexdigest()
+
+    @classmethod
+    def load(cls, path: PathLike) -> Checkpoint:
+        """Reads a checkpoint from disk.
+
+        :param PathLike path: Path to a checkpoint written by `save`
+        :return Checkpoint: Snapshot of the simulation
+        """
+        with np.load(path) as data:
+            return cls(
+                int(data["step"]),
+                json.loads(str(data["rng_state"])),
+                data["presence"],
+                data["end_presence"],
+                data["transition_cnt"],
+                json.loads(str(data["models"])),
+                str(data["fingerprint"]),
+            )
+
+    def save(self, path: PathLike) -> None:
+        """Writes the checkpoint to disk, replacing any previous file atomically.
+
+        Arrays are stored compressed, so the file is a small fraction of the size
+        of the OD table.
+
+        :param PathLike path: Path the checkpoint is written to
+        """
+        # Write to a Temporary File First so a Crash Never Leaves a Partial Checkpoint
+        tmp_path = f"{os.fspath(path)}.tmp"
+
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                step=self.step,
+                rng_state=json.dumps(self.rng_state),
+                presence=self.presence,
+                end_presence=self.end_presence,
+                transition_cnt=self.transition_cnt,
+                models=json.dumps(self.models),
+                fingerprint=self.fingerprint,
+            )
+
+        os.replace(tmp_path, path)
+
+    def generator(self) -> Generator:
+        """Recreates the random number generator at the saved position.
+
+        :return Generator: Generator that continues the saved stream
+        """
+        bit_generator = getattr(np.random, self.rng_state["bit_generator"])()
+        bit_generator.state = self.rng_state
+        return np.random.Generator(bit_generator)
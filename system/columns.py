@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Writes columns too large for memory to .npy files a chunk at a time."""
+
+from __future__ import annotations
+
+import os
+
+import numpy as np
+
+from os import PathLike
+from typing import Dict
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+
+class ColumnWriter:
+    """
+    A class used to append chunks of columns to disk and convert them to `.npy` files.
+
+    Chunks are appended to a raw file per column as they arrive, so memory use is
+    bounded by the chunk size. When the context exits without error, each raw file
+    is copied a block at a time into a `.npy` file named after its column. Raw
+    files are removed either way.
+
+    Attributes
+    ----------
+    directory : PathLike
+        Directory the columns are written to.
+    dtypes : Dict[str, dtype]
+        Names of the columns mapped to their types.
+    lengths : Dict[str, int]
+        Number of values appended to each column.
+
+    Methods
+    -------
+    append(name, values)
+        Appends values to the end of a column.
+
+    Example
+    -------
+    > with ColumnWriter("/path/to/store", {"indices": np.int32}) as writer:
+    >     for to_codes in chunks:
+    >         writer.append("indices", to_codes)
+    > indices = np.load("/path/to/store/indices.npy", mmap_mode="r")
+    """
+
+    # Number of Values Copied from a Raw File at a Time
+    BLOCK_SIZE = 2**22
+
+    def __init__(self, directory: PathLike, dtypes: Dict[str, object]) -> None:
+        """Initializes the ColumnWriter class.
+
+        :param PathLike directory: Directory the columns are written to
+        :param Dict[str, object] dtypes: Names of the columns mapped to their types
+        """
+        self.directory = directory
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in dtypes.items()}
+        self.lengths = dict.fromkeys(self.dtypes, 0)
+        self._raw_files = {}
+
+    def __enter__(self) -> ColumnWriter:
+        os.makedirs(self.directory, exist_ok=True)
+        self._raw_files = {
+            name: open(self._raw_path(name), "wb") for name in self.dtypes
+        }
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        for f in self._raw_files.values():
+            f.close()
+
+        try:
+            if exc_type is None:
+                for name in self.dtypes:
+                    self._convert(name)
+        finally:
+            for name in self._raw_files:
+                os.remove(self._raw_path(name))
+
+    def append(self, name: str, values) -> None:
+        """Appends values to the end of a column.
+
+        :param str name: Name of the column
+        :param values: Array-like of values, converted to the column's type
+        """
+        values = np.ascontiguousarray(values, dtype=self.dtypes[name])
+        self._raw_files[name].write(values.tobytes())
+        self.lengths[name] += len(values)
+
+    def _raw_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.raw")
+
+    def _convert(self, name: str) -> None:
+        dtype, length = self.dtypes[name], self.lengths[name]
+        npy_path = os.path.join(self.directory, f"{name}.npy")
+
+        # Empty Files cannot be Memory-Mapped
+        if length == 0:
+            np.save(npy_path, np.empty(0, dtype=dtype))
+            return
+
+        # Copy Raw Values into the .npy a Block at a Time
+        raw = np.memmap(self._raw_path(name), dtype=dtype, mode="r", shape=(length,))
+        column = np.lib.format.open_memmap(
+            npy_path, mode="w+", dtype=dtype, shape=(length,)
+        )
+
+        for start in range(0, length, self.BLOCK_SIZE):
+            stop = start + self.BLOCK_SIZE
+            column[start:stop] = raw[start:stop]
+
+        column.flush()
+        del raw, column
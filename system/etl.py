@@ -1,22 +1,364 @@
 # -*- coding: utf-8 -*-
 """Simplifies the extraction, transformation, and loading of data into a local FGDB."""
 
+import codecs
+import gzip
+import json
 import os
+import time
 
+import numpy as np
 import pandas as pd
 import requests
-
-import arcgis
-import arcpy
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from os import PathLike
-from pandas import DataFrame, Series
-from typing import List
+from pandas import DataFrame
+from typing import Callable, Iterator, List, Tuple
+
+from columns import ColumnWriter
+
+try:
+    import arcgis
+    import arcpy
+except ImportError:
+    arcgis = None
+    arcpy = None
 
 __author__ = "Luke Zaruba"
 __credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
 __status__ = "Production"
 
+# Seconds after a Month Ends before the API's Daily Values for it are Complete
+SETTLE_TIME = 24 * 3600
+
+
+def _complete(year: int, month: int, fetched: float) -> bool:
+    # A Copy of a Month is Complete Only if Fetched once the Month had Settled
+    year, month = int(year), int(month)
+    month_end = datetime(year + month // 12, month % 12 + 1, 1).timestamp()
+    return fetched >= month_end + SETTLE_TIME
+
+
+class ResponseCache:
+    """
+    A class used to keep compressed copies of API responses on disk.
+
+    Responses are keyed by network, year and month. A copy fetched a day
+    (`SETTLE_TIME`) or more after its month ended never changes, so it is
+    served from disk without touching the network. Any other copy, such as one
+    of the current month or one fetched while its month was in progress, is
+    revalidated once older than `ttl`, sending the stored ETag/Last-Modified
+    so that an unchanged response costs only a 304. In offline mode only
+    cached responses are served, however old.
+
+    Methods
+    -------
+    fetch(get, url, month, year, timeout)
+        Returns the body of a response, from disk where possible.
+    fetched(url, month, year)
+        Returns when the stored copy of a response was fetched or last revalidated.
+
+    Example
+    -------
+    > cache = ResponseCache("/path/to/cache", ttl=6 * 3600)
+    > weather_df = WeatherLoader.multi_month([6, 7, 8], 2022, cache=cache)
+    > offline_df = WeatherLoader.multi_month([6, 7, 8], 2022, cache=ResponseCache("/path/to/cache", offline=True))
+    """
+
+    def __init__(self, directory: PathLike, ttl=3600, offline=False) -> None:
+        """Initializes the ResponseCache class.
+
+        :param PathLike directory: Directory responses are stored in
+        :param float ttl: Seconds an incomplete month's response stays fresh, defaults to 3600
+        :param bool offline: Serve only cached responses and never use the network, defaults to False
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.offline = offline
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str, month: int, year: int) -> Tuple[str, str]:
+        # Key Responses by Network, Year & Month
+        network = parse_qs(urlparse(url).query).get("network", ["default"])[0]
+        key = os.path.join(self.directory, f"{network}_{year}-{int(month):02d}")
+        return f"{key}.geojson.gz", f"{key}.json"
+
+    def fetch(
+        self, get: Callable, url: str, month: int, year: int, timeout=30
+    ) -> bytes:
+        """Returns the body of a response, from disk where possible.
+
+        :param Callable get: Function used for HTTP GET requests, e.g. `Session.get`
+        :param str url: URL of the request
+        :param int month: Month the response covers
+        :param int year: Year the response covers
+        :param float timeout: Seconds to wait for the server before giving up, defaults to 30
+        :return bytes: Uncompressed body of the response
+        """
+        data_path, meta_path = self._paths(url, month, year)
+
+        meta = None
+        if os.path.exists(data_path) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+
+        if meta is None and self.offline:
+            raise FileNotFoundError(f"No cached response for {url} in offline mode")
+
+        if meta is not None:
+            # Settled Copies are Final, Others are Fresh for `ttl` Seconds
+            final = _complete(year, month, meta["fetched"])
+            fresh = time.time() - meta["fetched"] < self.ttl
+
+            if self.offline or final or fresh:
+                return self._read(data_path)
+
+        # Revalidate with the Validators of the Cached Response
+        headers = {}
+        if meta is not None and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta is not None and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = get(url, headers=headers, timeout=timeout)
+
+        if response.status_code == 304 and meta is not None:
+            meta["fetched"] = time.time()
+            self._write(meta_path, json.dumps(meta).encode())
+            return self._read(data_path)
+
+        response.raise_for_status()
+
+        # Store Response Body before its Metadata so a Crash Never Pairs Stale Data
+        self._write(data_path, gzip.compress(response.content))
+        meta = {
+            "url": url,
+            "fetched": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        self._write(meta_path, json.dumps(meta).encode())
+
+        return response.content
+
+    def fetched(self, url: str, month: int, year: int) -> float:
+        """Returns when the stored copy of a response was fetched or last revalidated.
+
+        :param str url: URL of the request
+        :param int month: Month the response covers
+        :param int year: Year the response covers
+        :return float: Epoch seconds of the last fetch, or None if nothing is stored
+        """
+        _, meta_path = self._paths(url, month, year)
+
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path) as f:
+            return json.load(f)["fetched"]
+
+    @staticmethod
+    def _read(path: PathLike) -> bytes:
+        with gzip.open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _write(path: PathLike, content: bytes) -> None:
+        # Write to a Temporary File First so Readers Never See a Partial File
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+
+        os.replace(tmp_path, path)
+
+
+class WeatherAccumulator:
+    """
+    A class used to keep running per-station weather totals for each month.
+
+    Each row holds the sums and counts of the cleaned daily values of a station
+    in one month, so adding a month only folds in that month's rows, and means
+    over any set of months come from the stored totals without refetching or
+    rescanning daily data. Rows also record when their month was fetched, so
+    totals taken before a month had settled are known to be partial. Totals
+    are persisted to a CSV when a path is given.
+
+    Methods
+    -------
+    periods()
+        Returns the (year, month) periods held.
+    complete_periods()
+        Returns the periods held whose totals were taken after the month had settled.
+    add(df, year, month, fetched)
+        Folds the cleaned daily values of a month in, replacing earlier totals for it.
+    aggregate(periods, years, months)
+        Returns mean values by station over the selected periods.
+    save()
+        Writes the totals to disk.
+
+    Example
+    -------
+    > accumulator = WeatherAccumulator("/path/to/weather_totals.csv")
+    > weather_df = WeatherLoader.multi_month([4, 5, 6, 7, 8, 9], 2022, accumulator=accumulator)
+    > seasonal_df = accumulator.aggregate(years=[2021, 2022], months=[4, 5, 6, 7, 8, 9])
+    """
+
+    # Fields Averaged by Station
+    FIELDS = ("max_tmpf", "min_tmpf", "precip")
+
+    def __init__(self, path: PathLike = None) -> None:
+        """Initializes the WeatherAccumulator class.
+
+        :param PathLike path: CSV the totals are read from and saved to, defaults to None for in-memory totals
+        """
+        self.path = path
+
+        sums = [f"{field}_sum" for field in self.FIELDS]
+        counts = [f"{field}_count" for field in self.FIELDS]
+        self.columns = [
+            "year",
+            "month",
+            "fetched",
+            "station",
+            "name",
+            "x",
+            "y",
+            *sums,
+            *counts,
+        ]
+
+        if path is not None and os.path.exists(path):
+            self.totals = pd.read_csv(path, dtype={"station": str, "name": str})
+
+            # Totals Saved without Fetch Times are Treated as Partial
+            if "fetched" not in self.totals:
+                self.totals.insert(2, "fetched", 0.0)
+        else:
+            self.totals = pd.DataFrame(
+                {
+                    "year": pd.Series(dtype="int64"),
+                    "month": pd.Series(dtype="int64"),
+                    "fetched": pd.Series(dtype=float),
+                    "station": pd.Series(dtype=str),
+                    "name": pd.Series(dtype=str),
+                    "x": pd.Series(dtype=float),
+                    "y": pd.Series(dtype=float),
+                    **{c: pd.Series(dtype=float) for c in sums},
+                    **{c: pd.Series(dtype="int64") for c in counts},
+                }
+            )
+
+    def periods(self) -> List[Tuple[int, int]]:
+        """Returns the (year, month) periods held.
+
+        :return List[Tuple[int, int]]: Periods with totals, in order
+        """
+        periods = self.totals[["year", "month"]].drop_duplicates()
+        return sorted(zip(periods["year"].tolist(), periods["month"].tolist()))
+
+    def complete_periods(self) -> List[Tuple[int, int]]:
+        """Returns the periods held whose totals were taken after the month had settled.
+
+        :return List[Tuple[int, int]]: Periods with complete totals, in order
+        """
+        fetched = self.totals.groupby(["year", "month"])["fetched"].min()
+        return [
+            (int(year), int(month))
+            for (year, month), stamp in fetched.items()
+            if _complete(year, month, stamp)
+        ]
+
+    def add(self, df: DataFrame, year: int, month: int, fetched: float = None) -> None:
+        """Folds the cleaned daily values of a month in, replacing earlier totals for it.
+
+        :param DataFrame df: Cleaned daily values, as left by `WeatherLoader.transform`
+        :param int year: Year the values cover
+        :param int month: Month the values cover
+        :param float fetched: Epoch seconds the values were fetched at, defaults to None for now
+        """
+        # Sum & Count Daily Values by Station
+        grouped = df.groupby("station", sort=False)
+        totals = grouped[["name", "x", "y"]].first()
+
+        for field in self.FIELDS:
+            totals[f"{field}_sum"] = grouped[field].sum()
+            totals[f"{field}_count"] = grouped[field].count()
+
+        totals = totals.reset_index()
+        totals.insert(0, "year", int(year))
+        totals.insert(1, "month", int(month))
+        totals.insert(2, "fetched", time.time() if fetched is None else fetched)
+
+        # Replace Earlier Totals of the Same Month
+        kept = self.totals.loc[
+            (self.totals["year"] != int(year)) | (self.totals["month"] != int(month))
+        ]
+        frames = [frame for frame in (kept, totals[self.columns]) if len(frame)]
+
+        if frames:
+            self.totals = pd.concat(frames, ignore_index=True)
+
+    def aggregate(
+        self,
+        periods: List[Tuple[int, int]] = None,
+        years: List[int] = None,
+        months: List[int] = None,
+    ) -> DataFrame:
+        """Returns mean values by station over the selected periods.
+
+        Station names and coordinates are taken from the latest period, as
+        `WeatherLoader.multi_month` always has.
+
+        :param List[Tuple[int, int]] periods: (year, month) periods to include, defaults to None for all
+        :param List[int] years: Years to include, defaults to None for all
+        :param List[int] months: Months to include, e.g. a season, defaults to None for all
+        :return DataFrame: DataFrame of average values by station
+        """
+        # Select Periods
+        mask = pd.Series(True, index=self.totals.index)
+
+        if periods is not None:
+            keys = self.totals["year"] * 100 + self.totals["month"]
+            mask &= keys.isin([int(y) * 100 + int(m) for y, m in periods])
+        if years is not None:
+            mask &= self.totals["year"].isin(years)
+        if months is not None:
+            mask &= self.totals["month"].isin(months)
+
+        selected = self.totals.loc[mask].sort_values(
+            ["year", "month"], ascending=False, kind="stable"
+        )
+
+        # Combine Totals by Station, Latest Period First
+        grouped = selected.groupby("station")
+        aggregated_df = grouped[["name", "x", "y"]].first()
+        aggregated_df.insert(0, "station", aggregated_df.index)
+
+        for field in self.FIELDS:
+            sums = grouped[f"{field}_sum"].sum()
+            counts = grouped[f"{field}_count"].sum()
+            aggregated_df[field] = sums / counts.where(counts > 0)
+
+        return aggregated_df
+
+    def save(self) -> None:
+        """Writes the totals to disk."""
+        if self.path is None:
+            return
+
+        # Write to a Temporary File First so Readers Never See a Partial File
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self.totals.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+
 
 class WeatherLoader:
     """
@@ -24,12 +366,14 @@ class WeatherLoader:
 
     Methods
     -------
-    multi_month(months, year)
-        Class method. Runs extraction/transformation on multiple months.
+    multi_month(months, year, max_workers, timeout, retries, backoff, base_url, cache, accumulator)
+        Class method. Runs extraction/transformation on multiple months concurrently.
+    create_session(pool_size, retries, backoff)
+        Static method. Creates a pooled HTTP session that retries failed requests.
     load(geodatabase, fc_name, df)
         Static method. Loads DataFrame to geodatabase.
-    _extractColumn(df, field)
-        Static, private method. Used for converting JSON to DataFrame.
+    _parse(content)
+        Static, private method. Used for converting GeoJSON to DataFrame.
     extract()
         Runs the extraction process for the data and returns as DataFrame.
     transform()
@@ -46,62 +390,131 @@ class WeatherLoader:
     > WeatherLoader.load("/path/to/example.gdb", "feature_class", aggregated_df)
     """
 
-    def __init__(self, month=1, year=2023):
+    # URL of the IEM Daily Summary API, with Month & Year Placeholders
+    BASE_URL = r"https://mesonet.agron.iastate.edu/api/1/daily.geojson?network=MN_RWIS&month=_M_&year=_Y_"
+
+    def __init__(
+        self,
+        month=1,
+        year=2023,
+        session: Session = None,
+        timeout=30,
+        base_url=None,
+        cache: ResponseCache = None,
+    ):
         """Initializes the WeatherLoader class.
 
         :param int month: Month that data will be queried for, defaults to 1
         :param int year: Year that data will be queried for, defaults to 2023
+        :param Session session: HTTP session used for requests, defaults to a new request per extraction
+        :param float timeout: Seconds to wait for the server before giving up, defaults to 30
+        :param str base_url: URL with _M_ and _Y_ placeholders, defaults to the IEM API
+        :param ResponseCache cache: Cache that responses are read from and stored in, defaults to None
         """
         self.month = month
         self.year = year
+        self.session = session
+        self.timeout = timeout
+        self.cache = cache
+        self.fetched = None
 
         # Set Base URL
-        self.url = r"https://mesonet.agron.iastate.edu/api/1/daily.geojson?network=MN_RWIS&month=_M_&year=_Y_".replace(
-            "_M_", str(self.month)
-        ).replace(
-            "_Y_", str(self.year)
+        self.url = (
+            (base_url or self.BASE_URL)
+            .replace("_M_", str(self.month))
+            .replace("_Y_", str(self.year))
         )
 
     @classmethod
-    def multi_month(cls, months: List[int], year: int) -> DataFrame:
+    def multi_month(
+        cls,
+        months: List[int],
+        year: int,
+        max_workers=4,
+        timeout=30,
+        retries=3,
+        backoff=0.5,
+        base_url=None,
+        cache: ResponseCache = None,
+        accumulator: WeatherAccumulator = None,
+    ) -> DataFrame:
         """Extracts daily values across multiple months, cleans, and aggregates into a single df.
 
+        Months are fetched concurrently by a pool of threads sharing one pooled
+        session, so at most `max_workers` requests are in flight at once.
+        Failed requests are retried with exponential backoff. Each month is
+        reduced to per-station totals as it arrives. With an accumulator, months
+        held with totals fetched after the month had settled are not fetched
+        again, months held only partially are refetched, and the totals are
+        saved for later runs.
+
         :param List[int] months: Months that data will be queried for
         :param int year: Year that data will be queried for
-        :return DataFrame: _description_
+        :param int max_workers: Largest number of months fetched at once, defaults to 4
+        :param float timeout: Seconds to wait for the server before giving up, defaults to 30
+        :param int retries: Number of times a failed request is retried, defaults to 3
+        :param float backoff: Backoff factor between retries in seconds, defaults to 0.5
+        :param str base_url: URL with _M_ and _Y_ placeholders, defaults to the IEM API
+        :param ResponseCache cache: Cache that responses are read from and stored in, defaults to None
+        :param WeatherAccumulator accumulator: Totals that months are folded into, defaults to in-memory totals
+        :return DataFrame: DataFrame of average values by station
         """
-        # Loop through months, clean, create df, and append to list
-        aggregated_df = pd.DataFrame(
-            columns=("station", "name", "x", "y", "max_tmpf", "min_tmpf", "precip")
-        )
 
-        for m in months:
+        def extract_month(month: int) -> Tuple[DataFrame, float]:
             # Create Monthly Loader, Extract & Clean
-            wl = WeatherLoader(m, year)
+            wl = cls(month, year, session, timeout, base_url, cache)
             wl.extract()
             wl.transform()
+            return wl.df, wl.fetched
 
-            # Append Cleaned DF to Final DF
-            aggregated_df = pd.concat([wl.df, aggregated_df], axis=0)
+        if accumulator is None:
+            accumulator = WeatherAccumulator()
 
-        # Perform Aggregation by Station
-        agg_functions = {
-            "station": "first",
-            "name": "first",
-            "x": "first",
-            "y": "first",
-            "max_tmpf": "mean",
-            "min_tmpf": "mean",
-            "precip": "mean",
-        }
+        # Skip Months Already Held with Complete Totals
+        complete = set(accumulator.complete_periods())
+        pending = [
+            month for month in months if (int(year), int(month)) not in complete
+        ]
 
-        # Perform Aggregation
-        aggregated_df = aggregated_df.groupby(aggregated_df["station"]).aggregate(
-            agg_functions
+        with cls.create_session(max_workers, retries, backoff) as session:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Fold Each Month into the Totals as it Arrives
+                results = executor.map(extract_month, pending)
+                for month, (df, fetched) in zip(pending, results):
+                    accumulator.add(df, year, month, fetched)
+
+        accumulator.save()
+
+        # Average Totals by Station
+        return accumulator.aggregate(periods=[(year, month) for month in months])
+
+    @staticmethod
+    def create_session(pool_size=4, retries=3, backoff=0.5) -> Session:
+        """Creates a pooled HTTP session that retries failed requests.
+
+        Connection errors and 429/5xx responses are retried up to `retries`
+        times, waiting `backoff` * 2^(attempt - 1) seconds between attempts.
+
+        :param int pool_size: Number of connections kept open, defaults to 4
+        :param int retries: Number of times a failed request is retried, defaults to 3
+        :param float backoff: Backoff factor between retries in seconds, defaults to 0.5
+        :return Session: Session to share between loaders
+        """
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
         )
 
-        # Return DF
-        return aggregated_df
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        return session
 
     @staticmethod
     def load(geodatabase: PathLike, fc_name: str, df: DataFrame) -> None:
@@ -111,6 +524,11 @@ class WeatherLoader:
         :param str fc_name: Name of the output feature class
         :param DataFrame df: Input dataframe that will be converted to a feature class
         """
+        if arcgis is None:
+            raise ImportError(
+                "Loading to a geodatabase requires arcgis, install arcgis"
+            )
+
         # Convert Weather Observations from DF to SEDF
         sedf = arcgis.GeoAccessor.from_xy(df, "x", "y")
 
@@ -118,13 +536,29 @@ class WeatherLoader:
         sedf.spatial.to_featureclass(location=os.path.join(geodatabase, fc_name))
 
     @staticmethod
-    def _extractToCol(df: DataFrame, field: Series) -> None:
-        """Function to extract fields from dicts that are columns in DF.
+    def _parse(content: bytes) -> DataFrame:
+        """Function to convert a GeoJSON response to a DataFrame in a single pass.
+
+        Each feature is reduced to a tuple of the needed values as soon as it is
+        decoded, so the dicts of a feature are freed straight away and memory
+        stays proportional to the output columns.
 
-        :param DataFrame df: DataFrame containing raw values that need to be seperated
-        :param Series field: Name of Series/column that will be created
+        :param bytes content: Body of the GeoJSON response
+        :return DataFrame: DataFrame with one row per feature
         """
-        df[field] = df["properties"].apply(lambda x: dict(x)[field])
+        properties = ["station", "date", "max_tmpf", "min_tmpf", "precip", "name"]
+
+        def to_record(obj: dict):
+            # Features are Decoded after their Properties & Geometry
+            if "properties" in obj and "geometry" in obj:
+                x, y = obj["geometry"]["coordinates"][:2]
+                return (*(obj["properties"][p] for p in properties), x, y)
+
+            return obj
+
+        features = json.loads(content, object_hook=to_record)["features"]
+
+        return pd.DataFrame.from_records(features, columns=[*properties, "x", "y"])
 
     def aggregate(self) -> DataFrame:
         """Aggregates daily values to monthly summary at each weather station.
@@ -153,29 +587,26 @@ class WeatherLoader:
     def extract(self) -> None:
         """Extracts data from API and performs miminal cleaning to return as a DataFrame."""
         # Get Response & Convert to DF
-        response = requests.get(self.url)
-        json = response.json()["features"]
-        df_raw = pd.DataFrame.from_records(json)
-
-        # Series Conversion from Dicts to Actual Vals
-        desiredSeries = ["station", "date", "max_tmpf", "min_tmpf", "precip", "name"]
-
-        for s in desiredSeries:
-            self._extractToCol(df_raw, s)
-
-        # Extract Geometries
-        df_raw["x"] = df_raw["geometry"].apply(lambda x: dict(x)["coordinates"][0])
-        df_raw["y"] = df_raw["geometry"].apply(lambda x: dict(x)["coordinates"][1])
-
-        # Copy Useful Columns to new DF
-        self.df = df_raw[
-            ["station", "date", "max_tmpf", "min_tmpf", "precip", "name", "x", "y"]
-        ].copy()
+        get = requests.get if self.session is None else self.session.get
+
+        if self.cache is None:
+            response = get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            content = response.content
+            self.fetched = time.time()
+        else:
+            content = self.cache.fetch(
+                get, self.url, self.month, self.year, self.timeout
+            )
+            self.fetched = self.cache.fetched(self.url, self.month, self.year)
+
+        # Convert Features to Columns in a Single Pass
+        self.df = self._parse(content)
 
     def transform(self) -> None:
         """Transforms and performs QAQC on raw DataFrame to create cleaned DataFrame."""
         # Fill NA Precip Values
-        self.df["precip"].fillna(0, inplace=True)
+        self.df["precip"] = self.df["precip"].fillna(0)
 
         # Drop Rows where 'precip' < 0
         self.df = self.df.loc[self.df["precip"] >= 0]
@@ -199,8 +630,16 @@ class ObservationLoader:
     """
     A class used to extract and transform BMSB observation data automatically.
 
+    Only the needed columns are read, with explicit dtypes. For exports too
+    large to hold in memory, `stream` cleans the CSV a chunk at a time and
+    writes each column to a .npy file, which `read_columns` opens again.
+
     Methods
     -------
+    stream(csv, output_dir, chunksize)
+        Class method. Cleans a CSV a chunk at a time and writes compact columns to disk.
+    read_columns(directory, mmap)
+        Static method. Reads columns written by `stream` as a DataFrame.
     load(geodatabase, fc_name)
         Loads DataFrame to geodatabase.
     transform()
@@ -211,18 +650,82 @@ class ObservationLoader:
     > observation_etl = ObservationLoader(r"/path/to/example.csv")
     > observation_etl.transform()
     > observation_etl.load("/path/to/example.gdb", "feature_class")
+    >
+    > ObservationLoader.stream(r"/path/to/national.csv", "/path/to/observations")
+    > observations_df = ObservationLoader.read_columns("/path/to/observations")
     """
 
+    # Columns Read from the CSV & their Types
+    COLUMNS = {
+        "objectid": "Int64",
+        "ObsDate": str,
+        "Latitude": "float64",
+        "Longitude": "float64",
+    }
+
+    # Types of the Columns Written by `stream`, Missing IDs are Stored as -1
+    OUTPUT_COLUMNS = {
+        "objectid": np.int64,
+        "ObsDate": "datetime64[ns]",
+        "Latitude": np.float64,
+        "Longitude": np.float64,
+    }
+
     def __init__(self, csv: PathLike) -> None:
         """Initializes the ObservationLoader class.
 
         :param PathLike csv: Path to CSV of BMSB observations.
         """
-        try:
-            self.df = pd.read_csv(csv)
+        self.encoding = self._detect_encoding(csv)
+        self.df = pd.read_csv(
+            csv, encoding=self.encoding, usecols=list(self.COLUMNS), dtype=self.COLUMNS
+        )
+
+    @classmethod
+    def stream(cls, csv: PathLike, output_dir: PathLike, chunksize=2**17) -> int:
+        """Cleans a CSV a chunk at a time and writes compact columns to disk.
+
+        Each chunk is cleaned as in `transform` and appended to a raw file per
+        column, so memory use is bounded by the chunk size. Columns are then
+        converted to .npy files named after them.
+
+        :param PathLike csv: Path to CSV of BMSB observations
+        :param PathLike output_dir: Directory the columns are written to
+        :param int chunksize: Number of rows read at a time, defaults to 2**17
+        :return int: Number of observations written
+        """
+        # Append Each Cleaned Chunk to the Output Columns
+        with ColumnWriter(output_dir, cls.OUTPUT_COLUMNS) as writer:
+            for chunk in cls._read_chunks(csv, chunksize):
+                chunk = cls._clean(chunk)
+
+                writer.append(
+                    "objectid", chunk["objectid"].to_numpy(np.int64, na_value=-1)
+                )
+                for name in ("ObsDate", "Latitude", "Longitude"):
+                    writer.append(
+                        name, chunk[name].to_numpy(cls.OUTPUT_COLUMNS[name])
+                    )
+
+        return writer.lengths["objectid"]
+
+    @classmethod
+    def read_columns(cls, directory: PathLike, mmap=True) -> DataFrame:
+        """Reads columns written by `stream` as a DataFrame.
 
-        except:
-            self.df = pd.read_csv(csv, encoding="unicode_escape")
+        :param PathLike directory: Directory the columns were written to
+        :param bool mmap: Map the columns from disk instead of reading them, defaults to True
+        :return DataFrame: Cleaned observations
+        """
+        return pd.DataFrame(
+            {
+                name: np.load(
+                    os.path.join(directory, f"{name}.npy"),
+                    mmap_mode="r" if mmap else None,
+                )
+                for name in cls.OUTPUT_COLUMNS
+            }
+        )
 
     def load(self, geodatabase: PathLike, fc_name: str) -> None:
         """Loads dataframe to feature class.
@@ -230,6 +733,11 @@ class ObservationLoader:
         :param PathLike geodatabase: Path to the geodatabase where the output feature class will be stored
         :param str fc_name: Name of the output feature class
         """
+        if arcgis is None:
+            raise ImportError(
+                "Loading to a geodatabase requires arcgis, install arcgis"
+            )
+
         # Convert from DF to SEDF
         sedf = arcgis.GeoAccessor.from_xy(self.df, "Longitude", "Latitude")
 
@@ -238,19 +746,45 @@ class ObservationLoader:
 
     def transform(self) -> None:
         """Cleans and transforms dataframe."""
-        # Narrow Down Columns
-        self.df = self.df[["objectid", "ObsDate", "Latitude", "Longitude"]].copy()
+        self.df = self._clean(self.df)
 
-        # Nulls
-        self.df = self.df.dropna(subset=["Latitude", "Longitude"])
+    @classmethod
+    def _read_chunks(cls, csv: PathLike, chunksize: int) -> Iterator[DataFrame]:
+        # Detect the Encoding Once, then Read Only the Needed Columns
+        with pd.read_csv(
+            csv,
+            encoding=cls._detect_encoding(csv),
+            usecols=list(cls.COLUMNS),
+            dtype=cls.COLUMNS,
+            chunksize=chunksize,
+        ) as reader:
+            yield from reader
+
+    @classmethod
+    def _clean(cls, df: DataFrame) -> DataFrame:
+        # Nulls & Geometry QA in One Mask, as Null Coordinates Compare False
+        lat, lon = df["Latitude"], df["Longitude"]
+        mask = (lon > -97.5) & (lon < -89.0) & (lat > 43.0) & (lat < 49.5)
+        df = df.loc[mask, list(cls.COLUMNS)].copy()
 
         # Casting
-        self.df["ObsDate"] = self.df["ObsDate"].astype("datetime64[ns]")
-        self.df["Latitude"] = self.df["Latitude"].astype(float)
-        self.df["Longitude"] = self.df["Longitude"].astype(float)
-
-        # Geometry QA
-        self.df = self.df.loc[self.df["Longitude"] > -97.5]
-        self.df = self.df.loc[self.df["Longitude"] < -89.0]
-        self.df = self.df.loc[self.df["Latitude"] > 43.0]
-        self.df = self.df.loc[self.df["Latitude"] < 49.5]
+        df["ObsDate"] = df["ObsDate"].astype("datetime64[ns]")
+
+        return df
+
+    @staticmethod
+    def _detect_encoding(csv: PathLike, block_size=2**20) -> str:
+        # Check the Whole File Decodes as UTF-8 without Holding it in Memory
+        decoder = codecs.getincrementaldecoder("utf-8")()
+
+        try:
+            with open(csv, "rb") as f:
+                for block in iter(lambda: f.read(block_size), b""):
+                    decoder.decode(block)
+
+            decoder.decode(b"", final=True)
+
+        except UnicodeDecodeError:
+            return "unicode_escape"
+
+        return "utf-8"
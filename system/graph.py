@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""Compiles origin-destination tables into integer-coded sparse graphs."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from numpy import ndarray
+from pandas import DataFrame, Index, Series
+from typing import Dict, List, Tuple
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+
+class ODGraph:
+    """
+    A class used to represent an OD table as a CSR adjacency over integer city codes.
+
+    Edges are the rows of the OD table, stably sorted by origin so that the
+    outgoing edges of city `c` are `indices[indptr[c]:indptr[c + 1]]`.
+
+    Attributes
+    ----------
+    cities : Index
+        City identifiers, position in the index is the city code.
+    names : Index
+        City names, aligned with `cities`.
+    from_codes, to_codes : ndarray
+        Origin and destination codes of each row, in table order.
+    indptr : ndarray
+        Origin offsets into the edge arrays (length cities + 1).
+    indices : ndarray
+        Destination code of each edge.
+    origins : ndarray
+        Origin code of each edge.
+    order : ndarray
+        Table row position of each edge.
+
+    Methods
+    -------
+    from_dataframe(df, from_id_field, to_id_field, from_key_field, to_key_field)
+        Class method. Compiles a graph from an OD DataFrame.
+    to_edges(values)
+        Reorders row-aligned values into edge order.
+    to_rows(values)
+        Reorders edge-aligned values into table row order.
+    incoming(values)
+        Sums edge values by destination city.
+    outgoing(values)
+        Sums edge values by origin city.
+
+    Example
+    -------
+    > graph = ODGraph.from_dataframe(merged_df, "City: From", "City: To")
+    > probability = graph.to_edges(merged_df["HM: Simple"])
+    > risk = graph.incoming(probability)
+    """
+
+    def __init__(
+        self, cities: Index, names: Index, from_codes: ndarray, to_codes: ndarray
+    ) -> None:
+        """Initializes the ODGraph class.
+
+        :param Index cities: Unique city identifiers
+        :param Index names: City names aligned with `cities`
+        :param ndarray from_codes: Origin code of each table row
+        :param ndarray to_codes: Destination code of each table row
+        """
+        self.cities = cities
+        self.names = names
+        self.from_codes = from_codes
+        self.to_codes = to_codes
+
+        # Sort Rows by Origin into CSR Layout
+        self.order = np.argsort(from_codes, kind="stable")
+        self.origins = from_codes[self.order]
+        self.indices = to_codes[self.order]
+        self.indptr = np.zeros(len(cities) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(from_codes, minlength=len(cities)), out=self.indptr[1:])
+
+        # Cities with at Least One Outgoing Edge
+        self.has_origin = np.diff(self.indptr) > 0
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: DataFrame,
+        from_id_field: str,
+        to_id_field: str,
+        from_key_field: str = None,
+        to_key_field: str = None,
+        city_fields: List[Tuple[str, str]] = None,
+    ) -> ODGraph:
+        """Compiles an OD DataFrame into a graph.
+
+        Cities are identified by name unless key fields are given, in which case
+        cities sharing a name are kept apart by their key. Names are not unique in
+        the Minnesota tables, so `ORIG_FID` & `DEST_FID` should be kept when the
+        attributes are merged and passed as the key fields. Without key fields, a
+        `ValueError` is raised if rows of one city disagree on any `city_fields`.
+        Categorical city fields sharing categories, as made by `compact_od_table`,
+        are encoded from their category codes without reading the labels.
+
+        :param DataFrame df: OD table with one row per origin-destination link
+        :param str from_id_field: Name of the origin city field
+        :param str to_id_field: Name of the destination city field
+        :param str from_key_field: Name of a unique origin identifier field, defaults to None
+        :param str to_key_field: Name of a unique destination identifier field, defaults to None
+        :param List[Tuple[str, str]] city_fields: Pairs of origin & destination fields holding city attributes, defaults to None
+        :return ODGraph: Compiled graph
+        """
+        num_rows = len(df)
+
+        if (from_key_field is None) != (to_key_field is None):
+            raise ValueError("Both or neither of the key fields must be given")
+
+        # Encode Cities as Integer Codes Shared by Both Sides of the Table
+        from_column = df[from_key_field or from_id_field]
+        to_column = df[to_key_field or to_id_field]
+
+        if (
+            isinstance(from_column.dtype, pd.CategoricalDtype)
+            and from_column.dtype == to_column.dtype
+        ):
+            # Factorize Category Codes Instead of Labels, Keeping Appearance Order
+            codes, uniques = pd.factorize(
+                np.concatenate([from_column.cat.codes, to_column.cat.codes])
+            )
+            cities = from_column.cat.categories[uniques]
+        else:
+            codes, cities = pd.factorize(
+                pd.concat([from_column, to_column], ignore_index=True)
+            )
+
+        codes = codes.astype(np.int32)
+
+        # Look up the Name of Each City
+        if from_key_field is None:
+            names = cities
+
+            # Cities Merged by Name must Agree on their Attributes
+            for from_field, to_field in city_fields or []:
+                _check_city_field(df[from_field], codes[:num_rows], cities)
+                _check_city_field(df[to_field], codes[num_rows:], cities)
+        else:
+            all_names = pd.concat([df[from_id_field], df[to_id_field]], ignore_index=True)
+            first = np.unique(codes, return_index=True)[1]
+            names = pd.Index(all_names.to_numpy()[first])
+
+        return cls(cities, names, codes[:num_rows], codes[num_rows:])
+
+    @property
+    def num_cities(self) -> int:
+        """Number of cities in the graph."""
+        return len(self.cities)
+
+    @property
+    def num_edges(self) -> int:
+        """Number of edges in the graph."""
+        return len(self.order)
+
+    def to_edges(self, values) -> ndarray:
+        """Reorders row-aligned values into edge order.
+
+        :param values: Array-like with one value per table row
+        :return ndarray: Values in edge order
+        """
+        return np.asarray(values)[self.order]
+
+    def to_rows(self, values: ndarray) -> ndarray:
+        """Reorders edge-aligned values into table row order.
+
+        :param ndarray values: Array with one value per edge
+        :return ndarray: Values in table row order
+        """
+        rows = np.empty_like(values)
+        rows[self.order] = values
+        return rows
+
+    def incoming(self, values: ndarray) -> ndarray:
+        """Sums edge values by destination city.
+
+        :param ndarray values: Array with one value per edge
+        :return ndarray: Sum of values per city
+        """
+        return np.bincount(self.indices, weights=values, minlength=self.num_cities)
+
+    def outgoing(self, values: ndarray) -> ndarray:
+        """Sums edge values by origin city.
+
+        :param ndarray values: Array with one value per edge
+        :return ndarray: Sum of values per city
+        """
+        return np.bincount(self.origins, weights=values, minlength=self.num_cities)
+
+
+def city_table(cities: Index, names: Index, fields: Dict[str, ndarray]) -> DataFrame:
+    """Builds a city-level DataFrame indexed by city identifier.
+
+    Names can repeat (CityTerritory.csv has several places named Saint Anthony),
+    so rows are keyed by the identifiers of `ODGraph.cities` and names are
+    carried in a City field instead.
+
+    :param Index cities: City identifiers, in city code order
+    :param Index names: City names aligned with `cities`
+    :param Dict[str, ndarray] fields: Field names mapped to one value per city
+    :return DataFrame: DataFrame of the City name & fields, indexed by "City Key"
+    """
+    return pd.DataFrame(
+        {"City": np.asarray(names, dtype=object), **fields},
+        index=pd.Index(cities, name="City Key"),
+    )
+
+
+def _check_city_field(values: Series, codes: ndarray, cities: Index) -> None:
+    # Find Cities whose Rows Hold More than One Value of the Field
+    distinct = values.groupby(codes).nunique()
+    conflicts = cities[distinct.index[distinct.to_numpy() > 1]]
+
+    if len(conflicts):
+        raise ValueError(
+            f"Cities sharing a name have conflicting '{values.name}' values "
+            f"({', '.join(map(str, conflicts[:5]))}), pass unique identifiers "
+            "such as 'ORIG_FID' & 'DEST_FID' as the key fields"
+        )
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Provides interchangeable backends for the simulation step kernel."""
+
+import numpy as np
+
+from numpy import ndarray
+from typing import Callable, List
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+
+def numpy_step(
+    indptr: ndarray,
+    origins: ndarray,
+    indices: ndarray,
+    has_origin: ndarray,
+    probability: ndarray,
+    n: ndarray,
+    presence: ndarray,
+    end_presence: ndarray,
+    starting_presence: ndarray,
+    transition_cnt: ndarray,
+) -> None:
+    """Advances every chain by one step, updating the state arrays in place.
+
+    All backends implement this signature and compare the same random numbers
+    against the same probabilities, so they produce identical results.
+
+    :param ndarray indptr: Origin offsets into the edge arrays
+    :param ndarray origins: Origin code of each edge
+    :param ndarray indices: Destination code of each edge
+    :param ndarray has_origin: Whether each city has outgoing edges
+    :param ndarray probability: Transition probabilities, shaped (chains, edges)
+    :param ndarray n: Random numbers, shaped (chains, edges)
+    :param ndarray presence: Starting presence, shaped (chains, cities)
+    :param ndarray end_presence: End presence, shaped (chains, cities)
+    :param ndarray starting_presence: Initial presence of each city
+    :param ndarray transition_cnt: Transition counts, shaped (chains, edges)
+    """
+    # Keep Edges with Presence at Origin where n < Probability
+    transferred = presence[:, origins] & (n < probability)
+    chain, edge = np.nonzero(transferred)
+
+    # Update Transition Counts & End Presence
+    transition_cnt += transferred
+    end_presence[chain, indices[edge]] = True
+
+    # Set New Starting Presence
+    presence[:] = end_presence
+
+    # If No City with Outgoing Edges has Presence, Reset to Initial Settings
+    extinct = ~(presence & has_origin).any(axis=1)
+    presence[extinct] = starting_presence
+
+
+def _compiled_step(
+    indptr: ndarray,
+    origins: ndarray,
+    indices: ndarray,
+    has_origin: ndarray,
+    probability: ndarray,
+    n: ndarray,
+    presence: ndarray,
+    end_presence: ndarray,
+    starting_presence: ndarray,
+    transition_cnt: ndarray,
+) -> None:
+    num_chains, num_cities = presence.shape
+
+    for k in range(num_chains):
+        # Only Visit the Outgoing Edges of Cities with Presence
+        for c in range(num_cities):
+            if presence[k, c]:
+                for e in range(indptr[c], indptr[c + 1]):
+                    if n[k, e] < probability[k, e]:
+                        transition_cnt[k, e] += 1
+                        end_presence[k, indices[e]] = True
+
+        # Set New Starting Presence & Check Whether Any Origin Remains
+        alive = False
+        for c in range(num_cities):
+            presence[k, c] = end_presence[k, c]
+            if end_presence[k, c] and has_origin[c]:
+                alive = True
+
+        # Reset to Initial Settings
+        if not alive:
+            for c in range(num_cities):
+                presence[k, c] = starting_presence[c]
+
+
+if numba is not None:
+    numba_step = numba.njit(cache=True, nogil=True)(_compiled_step)
+else:
+    numba_step = None
+
+# Step Kernels by Backend Name
+BACKENDS = {"numpy": numpy_step, "numba": numba_step}
+
+
+def available_backends() -> List[str]:
+    """Lists the backends that can be used in this environment.
+
+    :return List[str]: Names of the usable backends
+    """
+    return [name for name, step in BACKENDS.items() if step is not None]
+
+
+def select_backend(backend="auto") -> str:
+    """Resolves a requested backend to one that is available.
+
+    'auto' uses the compiled numba kernel when numba is installed and falls back
+    to numpy otherwise.
+
+    :param str backend: 'auto', 'numpy' or 'numba', defaults to "auto"
+    :return str: Name of the backend that will be used
+    """
+    if backend == "auto":
+        return "numba" if numba_step is not None else "numpy"
+
+    if backend not in BACKENDS:
+        raise ValueError("Backend must be in ['auto', 'numpy', 'numba']")
+
+    if BACKENDS[backend] is None:
+        raise ImportError(f"Backend '{backend}' is not available, install {backend}")
+
+    return backend
+
+
+def get_step(backend: str) -> Callable:
+    """Returns the step kernel of a backend.
+
+    :param str backend: Name of the backend, as returned by `select_backend`
+    :return Callable: Step kernel with the signature of `numpy_step`
+    """
+    return BACKENDS[select_backend(backend)]
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Generates origin-destination links between city centroids without ArcGIS."""
+
+import numpy as np
+import pandas as pd
+from itertools import chain
+
+from numpy import ndarray
+from pandas import DataFrame
+from typing import Iterator, Tuple
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+# Length of Each Unit in Meters
+UNITS = {
+    "METERS": 1.0,
+    "KILOMETERS": 1000.0,
+    "FEET": 0.3048,
+    "MILES": 1609.344,
+}
+
+
+def iter_links(
+    origins: ndarray,
+    destinations: ndarray = None,
+    num_nearest=100,
+    search_distance: float = None,
+    distance_unit="MILES",
+    linear_unit="METERS",
+    chunk_size=1024,
+) -> Iterator[Tuple[ndarray, ndarray, ndarray]]:
+    """Generates OD links a chunk of origins at a time.
+
+    Each origin is linked to its `num_nearest` nearest destinations, only
+    counting those within `search_distance` if given, or to every destination
+    within `search_distance` if `num_nearest` is None. When `destinations` is
+    None, origins are linked to each other and never to themselves.
+
+    Coordinates must be projected (e.g. UTM zone 15N for Minnesota). Codes are
+    row positions in `origins` and `destinations`, so they can be used directly
+    as the city codes of an `ODGraph`.
+
+    :param ndarray origins: Origin centroid coordinates, shaped (origins, 2)
+    :param ndarray destinations: Destination centroid coordinates, defaults to the origins
+    :param int num_nearest: Number of destinations linked to each origin, defaults to 100
+    :param float search_distance: Largest link distance, in `distance_unit`, defaults to None
+    :param str distance_unit: Unit of link distances, defaults to "MILES"
+    :param str linear_unit: Unit of the coordinates, defaults to "METERS"
+    :param int chunk_size: Number of origins linked per chunk, defaults to 1024
+    :return Iterator[Tuple[ndarray, ndarray, ndarray]]: Origin codes, destination codes & distances of each chunk
+    """
+    if distance_unit not in UNITS or linear_unit not in UNITS:
+        raise ValueError(f"Units must be in {list(UNITS)}")
+
+    if num_nearest is None and search_distance is None:
+        raise ValueError("Either num_nearest or search_distance must be given")
+
+    if cKDTree is None:
+        raise ImportError("Generating links requires scipy, install scipy")
+
+    origins = np.asarray(origins, dtype=float)
+    same = destinations is None
+    tree = cKDTree(origins if same else np.asarray(destinations, dtype=float))
+
+    # Convert between Coordinate Units & Distance Units
+    scale = UNITS[linear_unit] / UNITS[distance_unit]
+    radius = np.inf if search_distance is None else search_distance / scale
+
+    for start in range(0, len(origins), chunk_size):
+        stop = min(start + chunk_size, len(origins))
+        points = origins[start:stop]
+        codes = np.arange(start, stop)
+
+        if num_nearest is None:
+            # Every Destination within the Radius, Ordered by Distance
+            found = tree.query_ball_point(points, radius, workers=-1)
+            lengths = np.fromiter(map(len, found), dtype=np.int64, count=len(found))
+            from_codes = np.repeat(codes, lengths)
+            to_codes = np.fromiter(
+                chain.from_iterable(found), dtype=np.int64, count=lengths.sum()
+            )
+            offsets = origins[from_codes] - tree.data[to_codes]
+            distance = np.sqrt(np.einsum("ij,ij->i", offsets, offsets))
+
+            # Skip the Origin Itself & Order by Distance
+            order = np.lexsort((to_codes, distance, from_codes))
+            if same:
+                order = order[to_codes[order] != from_codes[order]]
+            from_codes, to_codes, distance = (
+                from_codes[order],
+                to_codes[order],
+                distance[order],
+            )
+
+        else:
+            # Nearest Destinations, with One Extra to Drop the Origin Itself
+            k = num_nearest + same
+            distance, to_codes = tree.query(
+                points,
+                k=k,
+                distance_upper_bound=np.nextafter(radius, np.inf),
+                workers=-1,
+            )
+            distance = distance.reshape(len(points), k)
+            to_codes = to_codes.reshape(len(points), k)
+            from_codes = np.repeat(codes[:, None], k, axis=1)
+
+            # Keep num_nearest per Origin, Skipping Itself & Missing Neighbours
+            keep = (to_codes < tree.n) & (distance <= radius)
+            if same:
+                keep &= to_codes != from_codes
+                keep &= np.cumsum(keep, axis=1) <= num_nearest
+
+            from_codes, to_codes, distance = (
+                from_codes[keep],
+                to_codes[keep],
+                distance[keep],
+            )
+
+        yield from_codes.astype(np.int32), to_codes.astype(np.int32), distance * scale
+
+
+def build_links(
+    origins: ndarray, destinations: ndarray = None, **kwargs
+) -> Tuple[ndarray, ndarray, ndarray]:
+    """Generates all OD links at once, see `iter_links` for the options.
+
+    :param ndarray origins: Origin centroid coordinates, shaped (origins, 2)
+    :param ndarray destinations: Destination centroid coordinates, defaults to the origins
+    :return Tuple[ndarray, ndarray, ndarray]: Origin codes, destination codes & distances
+    """
+    chunks = list(iter_links(origins, destinations, **kwargs))
+
+    if not chunks:
+        return np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0)
+
+    return tuple(np.concatenate(arrays) for arrays in zip(*chunks))
+
+
+def distance_lags(ids, x, y, **kwargs) -> DataFrame:
+    """Builds the distance lag table produced by `GenerateOriginDestinationLinks`.
+
+    The table has the ORIG_FID, DEST_FID and LINK_DIST fields of the exported
+    `Distance_Lags.csv`, so it can be merged with city attributes as before.
+
+    :param ids: Feature ID of each city
+    :param x: X coordinate of each city centroid
+    :param y: Y coordinate of each city centroid
+    :return DataFrame: One row per link with ORIG_FID, DEST_FID & LINK_DIST
+    """
+    ids = np.asarray(ids)
+    from_codes, to_codes, distance = build_links(np.column_stack([x, y]), **kwargs)
+
+    return pd.DataFrame(
+        {
+            "ORIG_FID": ids[from_codes],
+            "DEST_FID": ids[to_codes],
+            "LINK_DIST": distance,
+        }
+    )
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""Reports progress, timings and resource use of long-running simulations."""
+
+import json
+import sys
+import time
+
+from contextlib import contextmanager, nullcontext
+from os import PathLike
+from tqdm import tqdm
+from typing import Dict
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+
+def peak_rss_mb() -> float:
+    """Returns the peak resident set size of this process and its children.
+
+    :return float: Peak RSS in MB, or None where the resource module is unavailable
+    """
+    if resource is None:
+        return None
+
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+
+    # Linux Reports Kilobytes, macOS Reports Bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class Monitor:
+    """
+    A class used to receive progress and timings from a simulation, doing nothing with them.
+
+    Subclasses override the hooks they need. A run calls `start` once, wraps the
+    work of each step in `phase` blocks, calls `advance` after each step and
+    calls `finish` at the end.
+
+    Methods
+    -------
+    start(task, total)
+        Marks the start of a run of `total` steps.
+    resume(steps)
+        Marks steps completed by an earlier, interrupted run.
+    phase(name)
+        Context manager that times a block of work as part of a phase.
+    add_time(name, seconds)
+        Adds time measured elsewhere, e.g. in a worker process, to a phase.
+    advance(steps, draws)
+        Marks the completion of steps and the random numbers they drew.
+    finish()
+        Marks the end of the run.
+
+    Example
+    -------
+    > sim.monte_carlo("HUFF_MODEL", 100, engine="numpy", monitor=Monitor())
+    """
+
+    def start(self, task: str, total: int) -> None:
+        """Marks the start of a run.
+
+        :param str task: Name of the run
+        :param int total: Number of steps the run will complete
+        """
+
+    def resume(self, steps: int) -> None:
+        """Marks steps completed by an earlier, interrupted run.
+
+        :param int steps: Number of steps already completed
+        """
+
+    def phase(self, name: str):
+        """Times a block of work as part of a phase.
+
+        :param str name: Name of the phase
+        :return: Context manager wrapping the block
+        """
+        return nullcontext()
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Adds time measured elsewhere to a phase.
+
+        :param str name: Name of the phase
+        :param float seconds: Time spent in the phase
+        """
+
+    def advance(self, steps=1, draws=0) -> None:
+        """Marks the completion of steps.
+
+        :param int steps: Number of steps completed, defaults to 1
+        :param int draws: Number of random numbers drawn by the steps, defaults to 0
+        """
+
+    def finish(self) -> None:
+        """Marks the end of the run."""
+
+
+class MetricsMonitor(Monitor):
+    """
+    A class used to collect timings, throughput and memory use of a simulation.
+
+    Timings and RNG draws accumulate from creation, so use a new monitor for
+    each run.
+
+    Methods
+    -------
+    metrics()
+        Returns the metrics collected so far.
+    emit(event)
+        Hook called with a metrics record on progress and at the end of the run.
+
+    Example
+    -------
+    > monitor = MetricsMonitor()
+    > sim.monte_carlo_batch("HUFF_MODEL", 100, 1000, workers=8, monitor=monitor)
+    > monitor.metrics()["sims_per_sec"]
+    """
+
+    def __init__(self, interval: float = None) -> None:
+        """Initializes the MetricsMonitor class.
+
+        :param float interval: Seconds between progress records, or None for a record at the end only, defaults to None
+        """
+        self.interval = interval
+        self.task = None
+        self.total = 0
+        self.steps = 0
+        self.draws = 0
+        self.timings = {}
+        self._started = None
+        self._initial = 0
+        self._last_emit = None
+
+    def start(self, task: str, total: int) -> None:
+        self.task = task
+        self.total = total
+        self._started = self._last_emit = time.perf_counter()
+
+    def resume(self, steps: int) -> None:
+        self.steps += steps
+        self._initial += steps
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def advance(self, steps=1, draws=0) -> None:
+        self.steps += steps
+        self.draws += draws
+
+        # Emit Progress Records at Most Once per Interval
+        if self.interval is not None:
+            now = time.perf_counter()
+
+            if now - self._last_emit >= self.interval:
+                self._last_emit = now
+                self.emit("progress")
+
+    def finish(self) -> None:
+        self.emit("finish")
+
+    def metrics(self) -> Dict:
+        """Returns the metrics collected so far.
+
+        Phase timings from worker processes are summed across workers, so they
+        can add up to more than the elapsed time.
+
+        :return Dict: Task, steps, elapsed seconds, sims/sec, RNG draws, phase timings & peak RSS
+        """
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        steps = self.steps - self._initial
+
+        return {
+            "task": self.task,
+            "steps": self.steps,
+            "total": self.total,
+            "elapsed": elapsed,
+            "sims_per_sec": steps / elapsed if elapsed > 0 else None,
+            "rng_draws": self.draws,
+            "phases": dict(self.timings),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def emit(self, event: str) -> None:
+        """Hook called with a metrics record on progress and at the end of the run.
+
+        :param str event: 'progress' or 'finish'
+        """
+
+
+class ProgressMonitor(MetricsMonitor):
+    """
+    A class used to display a progress bar while collecting metrics.
+
+    Example
+    -------
+    > sim.monte_carlo("HUFF_MODEL", 100, engine="numpy", monitor=ProgressMonitor())
+    """
+
+    def __init__(self, **kwargs) -> None:
+        """Initializes the ProgressMonitor class.
+
+        :param kwargs: Keyword arguments passed to `tqdm`
+        """
+        super().__init__()
+        self.kwargs = kwargs
+        self.bar = None
+
+    def start(self, task: str, total: int) -> None:
+        super().start(task, total)
+        self.bar = tqdm(total=total, desc=task, **self.kwargs)
+
+    def resume(self, steps: int) -> None:
+        super().resume(steps)
+        self.bar.update(steps)
+
+    def advance(self, steps=1, draws=0) -> None:
+        super().advance(steps, draws)
+        self.bar.update(steps)
+
+    def finish(self) -> None:
+        super().finish()
+        self.bar.close()
+
+
+class JSONLinesMonitor(MetricsMonitor):
+    """
+    A class used to append metrics records to a JSON-lines file.
+
+    Each record is one line holding the output of `metrics` and the event that
+    produced it, so a scheduler can follow a run while it progresses.
+
+    Example
+    -------
+    > monitor = JSONLinesMonitor("/path/to/metrics.jsonl", interval=30)
+    > sim.monte_carlo_batch("HUFF_MODEL", 100, 1000, workers=8, monitor=monitor)
+    """
+
+    def __init__(self, path: PathLike, interval: float = None) -> None:
+        """Initializes the JSONLinesMonitor class.
+
+        :param PathLike path: Path of the file records are appended to
+        :param float interval: Seconds between progress records, or None for a record at the end only, defaults to None
+        """
+        super().__init__(interval)
+        self.path = path
+
+    def emit(self, event: str) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"event": event, **self.metrics()}) + "\n")
@@ -2,18 +2,256 @@
 """Performs simulation of BMSB spread via Monte Carlo simulation."""
 
 import os
+import time
 
+import numpy as np
 import pandas as pd
-from random import random
-from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from statistics import NormalDist
 
-from pandas import DataFrame
-from typing import List
+from numpy import ndarray
+from numpy.random import Generator, SeedSequence
+from os import PathLike
+from pandas import DataFrame, Index
+from typing import List, Tuple
+
+from checkpoint import Checkpoint
+from graph import ODGraph, city_table
+from kernels import get_step, select_backend
+from metrics import MetricsMonitor, Monitor, ProgressMonitor
+from trajectory import Trajectory
 
 __author__ = "Luke Zaruba"
 __credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
 __status__ = "Production"
 
+# Fields Written by Each Model: Probability Numerator, Probability & Transition Count
+MODEL_FIELDS = {
+    "HUFF_MODEL": ("HM: Wi/Dij", "HM: Simple", "HS: Transition Count"),
+    "HUFF_MODEL_DD": ("HD2: Wi/Dij", "Huff: DD of 2", "HD2: Transition Count"),
+    "GRAVITY_MODEL": ("Gravity", "Gravity: Probability", "G: Transition Count"),
+}
+
+
+def model_fields(model: str) -> Tuple[str, str, str]:
+    """Returns the fields written by a model, checking that the model exists.
+
+    :param str model: Spatial interaction model, a key of `MODEL_FIELDS`
+    :return Tuple[str, str, str]: Probability numerator, probability & transition count fields
+    """
+    if model not in MODEL_FIELDS:
+        raise ValueError(f"Model must be in {list(MODEL_FIELDS)}")
+
+    return MODEL_FIELDS[model]
+
+
+# Arguments Shared by All Batches Run in a Worker Process, & its Warm-Up Time
+_worker_args = None
+_worker_warmup = 0.0
+
+
+class BatchResult:
+    """
+    A class used to store the transition counts of a batched Monte Carlo run.
+
+    Attributes
+    ----------
+    cities : Index
+        City identifiers, in the order used by the columns of `incoming` and `outgoing`.
+    names : Index
+        City names, aligned with `cities`.
+    transition_cnt : ndarray
+        Transition counts per OD row, pooled across all replicates.
+    incoming : ndarray
+        Incoming transition counts, shaped (replicates, cities).
+    outgoing : ndarray
+        Outgoing transition counts, shaped (replicates, cities).
+
+    Methods
+    -------
+    summary()
+        Summarizes Incoming/Outgoing counts across replicates for each city.
+    """
+
+    def __init__(
+        self,
+        cities: Index,
+        names: Index,
+        transition_cnt: ndarray,
+        incoming: ndarray,
+        outgoing: ndarray,
+    ) -> None:
+        """Initializes the BatchResult class.
+
+        :param Index cities: City identifiers matching the columns of the count matrices
+        :param Index names: City names aligned with `cities`
+        :param ndarray transition_cnt: Pooled transition counts per OD row
+        :param ndarray incoming: Incoming counts per replicate and city
+        :param ndarray outgoing: Outgoing counts per replicate and city
+        """
+        self.cities = cities
+        self.names = names
+        self.transition_cnt = transition_cnt
+        self.incoming = incoming
+        self.outgoing = outgoing
+
+    @property
+    def replicates(self) -> int:
+        """Number of replicates that were simulated."""
+        return self.incoming.shape[0]
+
+    def summary(self) -> DataFrame:
+        """Calculates the mean and standard deviation of counts across replicates.
+
+        :return DataFrame: City-level DataFrame of Incoming/Outgoing means & standard deviations
+        """
+        return city_table(
+            self.cities,
+            self.names,
+            {
+                "Incoming": self.incoming.mean(axis=0),
+                "Incoming: Std": self.incoming.std(axis=0, ddof=1)
+                if self.replicates > 1
+                else np.nan,
+                "Outgoing": self.outgoing.mean(axis=0),
+                "Outgoing: Std": self.outgoing.std(axis=0, ddof=1)
+                if self.replicates > 1
+                else np.nan,
+            },
+        )
+
+
+class RunningMoments:
+    """
+    A class used to keep running means and variances of per-city counts.
+
+    Batches of observations are folded in with the parallel form of Welford's
+    algorithm, so moments never need the individual observations again.
+
+    Methods
+    -------
+    update(values)
+        Folds a batch of observations into the running moments.
+    half_width(z)
+        Calculates confidence interval half-widths for the means.
+    """
+
+    def __init__(self, size: int) -> None:
+        """Initializes the RunningMoments class.
+
+        :param int size: Number of values in each observation
+        """
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    @property
+    def variance(self) -> ndarray:
+        """Sample variance of the observations."""
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+
+        return self.m2 / (self.count - 1)
+
+    def update(self, values: ndarray) -> None:
+        """Folds a batch of observations into the running moments.
+
+        :param ndarray values: Observations shaped (observations, size)
+        """
+        num_values = len(values)
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+
+        total = self.count + num_values
+        delta = batch_mean - self.mean
+        self.mean += delta * num_values / total
+        self.m2 += batch_m2 + delta**2 * self.count * num_values / total
+        self.count = total
+
+    def half_width(self, z: float) -> ndarray:
+        """Calculates confidence interval half-widths for the means.
+
+        :param float z: Standard normal quantile of the confidence level
+        :return ndarray: Half-width of the interval around each mean
+        """
+        return z * np.sqrt(self.variance / self.count)
+
+
+class AdaptiveResult:
+    """
+    A class used to store the outcome of a convergence-driven Monte Carlo run.
+
+    Attributes
+    ----------
+    cities : Index
+        City identifiers, aligned with the running moments.
+    names : Index
+        City names, aligned with `cities`.
+    transition_cnt : ndarray
+        Transition counts per OD row, pooled across all replicates.
+    incoming, outgoing : RunningMoments
+        Running moments of Incoming/Outgoing counts per replicate.
+    z : float
+        Standard normal quantile of the confidence level.
+    converged : bool
+        Whether every half-width fell below the tolerance within the budget.
+
+    Methods
+    -------
+    summary()
+        Summarizes Incoming/Outgoing means and interval half-widths for each city.
+    """
+
+    def __init__(
+        self,
+        cities: Index,
+        names: Index,
+        transition_cnt: ndarray,
+        incoming: RunningMoments,
+        outgoing: RunningMoments,
+        z: float,
+        converged: bool,
+    ) -> None:
+        """Initializes the AdaptiveResult class.
+
+        :param Index cities: City identifiers aligned with the running moments
+        :param Index names: City names aligned with `cities`
+        :param ndarray transition_cnt: Pooled transition counts per OD row
+        :param RunningMoments incoming: Running moments of Incoming counts
+        :param RunningMoments outgoing: Running moments of Outgoing counts
+        :param float z: Standard normal quantile of the confidence level
+        :param bool converged: Whether the tolerance was reached
+        """
+        self.cities = cities
+        self.names = names
+        self.transition_cnt = transition_cnt
+        self.incoming = incoming
+        self.outgoing = outgoing
+        self.z = z
+        self.converged = converged
+
+    @property
+    def replicates(self) -> int:
+        """Number of replicates that were simulated."""
+        return self.incoming.count
+
+    def summary(self) -> DataFrame:
+        """Calculates the mean and confidence interval half-width of counts for each city.
+
+        :return DataFrame: City-level DataFrame of Incoming/Outgoing means & half-widths
+        """
+        return city_table(
+            self.cities,
+            self.names,
+            {
+                "Incoming": self.incoming.mean,
+                "Incoming: Half Width": self.incoming.half_width(self.z),
+                "Outgoing": self.outgoing.mean,
+                "Outgoing: Half Width": self.outgoing.half_width(self.z),
+            },
+        )
+
 
 class Simulation:
     def __init__(
@@ -26,8 +264,31 @@ class Simulation:
         to_presence_field="BMSB Presence: To",
         to_id_field="City: To",
         to_w_field="W: To",
+        from_key_field=None,
+        to_key_field=None,
+        backend="auto",
     ) -> None:
-        self.df = df.copy()
+        """Initializes the Simulation class.
+
+        City names repeat in the Minnesota tables, so keep `ORIG_FID` & `DEST_FID`
+        when merging attributes onto the distance lags and pass them as the key
+        fields. Without key fields, cities are identified by name and a
+        `ValueError` is raised if rows of a name disagree on weight or presence.
+
+        :param DataFrame df: OD table with one row per origin-destination link
+        :param str dist_field: Name of the distance field, defaults to "Distance"
+        :param str from_presence_field: Name of the origin presence field, defaults to "BMSB Presence: From"
+        :param str from_id_field: Name of the origin city field, defaults to "City: From"
+        :param str from_w_field: Name of the origin weight field, defaults to "W: From"
+        :param str to_presence_field: Name of the destination presence field, defaults to "BMSB Presence: To"
+        :param str to_id_field: Name of the destination city field, defaults to "City: To"
+        :param str to_w_field: Name of the destination weight field, defaults to "W: To"
+        :param str from_key_field: Name of a unique origin identifier field such as "ORIG_FID", defaults to None
+        :param str to_key_field: Name of a unique destination identifier field such as "DEST_FID", defaults to None
+        :param str backend: Step kernel, 'auto', 'numpy' or 'numba', defaults to "auto"
+        """
+        self._source_df = df
+        self._df = None
         self.dist_field = dist_field
         self.from_presence_field = from_presence_field
         self.from_id_field = from_id_field
@@ -36,7 +297,63 @@ class Simulation:
         self.to_id_field = to_id_field
         self.to_w_field = to_w_field
 
-    def monte_carlo(self, model: str, num_sims: int, increase_prob=False) -> DataFrame:
+        # Choose Step Kernel, Compiled if Available
+        self.backend = select_backend(backend)
+
+        # Compile OD Table into Integer-Coded Graph
+        self.graph = ODGraph.from_dataframe(
+            df,
+            from_id_field,
+            to_id_field,
+            from_key_field,
+            to_key_field,
+            [(from_w_field, to_w_field), (from_presence_field, to_presence_field)],
+        )
+
+    @property
+    def df(self) -> DataFrame:
+        """Working copy of the OD DataFrame, made the first time it is needed."""
+        if self._df is None:
+            self._df = self._source_df.copy()
+
+        return self._df
+
+    def monte_carlo(
+        self,
+        model: str,
+        num_sims: int,
+        increase_prob=False,
+        engine="pandas",
+        seed=None,
+        checkpoint: PathLike = None,
+        checkpoint_every=10,
+        resume_from: PathLike = None,
+        trajectory: PathLike = None,
+        monitor: Monitor = None,
+    ) -> DataFrame:
+        """Runs the Monte Carlo simulation of a model as a single chain.
+
+        :param str model: Spatial interaction model used to calculate probabilities
+        :param int num_sims: Number of simulation steps to run
+        :param bool increase_prob: Artificially increase probabilities by 100x, defaults to False
+        :param str engine: Row-by-row 'pandas' engine or array-backed 'numpy' engine, defaults to "pandas"
+        :param int seed: Seed for the random number generator, defaults to None
+        :param PathLike checkpoint: Path that the run state is periodically saved to ('numpy' only), defaults to None
+        :param int checkpoint_every: Number of steps between checkpoints, defaults to 10
+        :param PathLike resume_from: Checkpoint to continue an interrupted run from ('numpy' only), defaults to None
+        :param PathLike trajectory: Path that infested cities after every step are recorded to ('numpy' only), defaults to None
+        :param Monitor monitor: Receives progress, phase timings and RNG draws, defaults to a progress bar
+        :return DataFrame: OD DataFrame with probability and transition count fields
+        """
+        # Validate Engine
+        if engine not in ["pandas", "numpy"]:
+            raise ValueError("Engine must be in ['pandas', 'numpy']")
+
+        if engine == "pandas" and (checkpoint or resume_from or trajectory):
+            raise ValueError(
+                "Checkpoints and trajectories are only supported by the 'numpy' engine"
+            )
+
         # Get Initial List of Starting Presence
         # starting_presence = list(
         #    self.df.loc[self.df[self.from_presence_field] == 1][
@@ -45,91 +362,972 @@ class Simulation:
         # )
         starting_presence = list(self.df[self.from_presence_field])
 
-        # Probability Fields
-        if model == "HUFF_MODEL":
-            probability_numerator = "HM: Wi/Dij"
-            probability_field = "HM: Simple"
-            transition_cnt_field = "HS: Transition Count"
+        monitor = ProgressMonitor() if monitor is None else monitor
+        monitor.start(f"{model} ({engine})", num_sims)
 
-            # Calculate
-            self.df[probability_numerator] = (
-                self.df[self.to_w_field] / self.df[self.dist_field]
+        # Calculate Probabilities
+        with monitor.phase("probability"):
+            probability_field, transition_cnt_field = self._calculate_probability(
+                model, increase_prob
             )
-            sum_prob_num = self.df[probability_numerator].sum()
-            self.df[probability_field] = self.df[probability_numerator] / sum_prob_num
 
-        elif model == "HUFF_MODEL_DD":
-            probability_numerator = "HD2: Wi/Dij"
-            probability_field = "Huff: DD of 2"
-            transition_cnt_field = "HD2: Transition Count"
+        # Init Transition Count Field
+        self.df[transition_cnt_field] = 0
 
-            # Calculate
-            self.df[probability_numerator] = self.df[self.to_w_field] / (
-                self.df[self.dist_field] ** 2
+        # Run Simulations
+        if engine == "numpy":
+            probability = self.graph.to_edges(
+                self.df[probability_field].to_numpy(dtype=float)
+            )
+            transition_cnt, presence = self._run_numpy_sims(
+                [model],
+                probability[np.newaxis],
+                num_sims,
+                np.random.default_rng(seed),
+                checkpoint,
+                checkpoint_every,
+                resume_from,
+                trajectory,
+                monitor,
             )
-            sum_prob_num = self.df[probability_numerator].sum()
-            self.df[probability_field] = self.df[probability_numerator] / sum_prob_num
-
-        elif model == "GRAVITY_MODEL":
-            probability_numerator = "Gravity"
-            probability_field = "Gravity: Probability"
-            transition_cnt_field = "G: Transition Count"
 
-            # Calculate
-            self.df[probability_numerator] = (
-                self.df[self.to_w_field] * self.df[self.from_w_field]
-            ) / self.df[self.dist_field]
-            sum_prob_num = self.df[probability_numerator].sum()
-            self.df[probability_field] = self.df[probability_numerator] / sum_prob_num
+            # Write Results Back to DataFrame
+            with monitor.phase("aggregation"):
+                transition_cnt = self.graph.to_rows(transition_cnt[0])
+                self.df[transition_cnt_field] = transition_cnt
+                self.df.loc[transition_cnt > 0, self.to_presence_field] = 1
+                self.df[self.from_presence_field] = presence[0][
+                    self.graph.from_codes
+                ].astype(self.df[self.from_presence_field].dtype)
 
         else:
-            raise ValueError(
-                "Model must be in ['HUFF_SIMPLE', 'HUFF_DECAY', 'GRAVITY_SIMPLE']"
+            rng = Random(seed)
+
+            for i in range(num_sims):
+                # Sampling & Propagation are Interleaved Row by Row
+                with monitor.phase("propagation"):
+                    draws = self._run_single_sim(
+                        probability_field, transition_cnt_field, starting_presence, rng
+                    )
+
+                monitor.advance(1, draws)
+
+        monitor.finish()
+
+        # Return
+        return self.df
+
+    def monte_carlo_cities(
+        self,
+        model: str,
+        num_sims: int,
+        increase_prob=False,
+        seed=None,
+        checkpoint: PathLike = None,
+        checkpoint_every=10,
+        resume_from: PathLike = None,
+        trajectory: PathLike = None,
+        monitor: Monitor = None,
+    ) -> DataFrame:
+        """Runs the numpy engine and returns city-level results without touching the OD table.
+
+        Probabilities and transition counts stay in arrays over the compiled graph
+        and are summed by city, so the OD DataFrame is never copied or modified.
+        Risk is the sum of incoming probabilities before any artificial increase.
+
+        :param str model: Spatial interaction model used to calculate probabilities
+        :param int num_sims: Number of simulation steps to run
+        :param bool increase_prob: Artificially increase probabilities by 100x, defaults to False
+        :param int seed: Seed for the random number generator, defaults to None
+        :param PathLike checkpoint: Path that the run state is periodically saved to, defaults to None
+        :param int checkpoint_every: Number of steps between checkpoints, defaults to 10
+        :param PathLike resume_from: Checkpoint to continue an interrupted run from, defaults to None
+        :param PathLike trajectory: Path that infested cities after every step are recorded to, defaults to None
+        :param Monitor monitor: Receives progress, phase timings and RNG draws, defaults to a progress bar
+        :return DataFrame: City-level DataFrame of Incoming, Outgoing & Risk
+        """
+        graph = self.graph
+        monitor = ProgressMonitor() if monitor is None else monitor
+        monitor.start(model, num_sims)
+
+        with monitor.phase("probability"):
+            probability = self._edge_probability(model, False)
+
+        # Run Simulations
+        transition_cnt, presence = self._run_numpy_sims(
+            [model],
+            (probability * 100 if increase_prob else probability)[np.newaxis],
+            num_sims,
+            np.random.default_rng(seed),
+            checkpoint,
+            checkpoint_every,
+            resume_from,
+            trajectory,
+            monitor,
+        )
+
+        # Aggregate by City
+        with monitor.phase("aggregation"):
+            cities_df = city_table(
+                graph.cities,
+                graph.names,
+                {
+                    "Incoming": graph.incoming(transition_cnt[0]).astype(np.int64),
+                    "Outgoing": graph.outgoing(transition_cnt[0]).astype(np.int64),
+                    "Risk": graph.incoming(probability),
+                },
             )
 
-        # Artificially Increase Probability by 100x
-        if increase_prob:
-            self.df[probability_field] *= 100
+        monitor.finish()
 
-        # Init Transition Count Field
-        self.df[transition_cnt_field] = 0
+        return cities_df
+
+    def monte_carlo_multi(
+        self,
+        models: List[str],
+        num_sims: int,
+        increase_prob=False,
+        seed=None,
+        checkpoint: PathLike = None,
+        checkpoint_every=10,
+        resume_from: PathLike = None,
+        trajectory: PathLike = None,
+        monitor: Monitor = None,
+    ) -> DataFrame:
+        """Runs several models in a single pass over the OD graph with common random numbers.
+
+        Every model advances its own chain, as with the numpy engine of `monte_carlo`,
+        but all of them are compared against the same random numbers at each step.
+        Differences between models are then due to the models rather than sampling
+        noise. Presence fields are left unchanged since each model ends in its own state.
+
+        :param List[str] models: Spatial interaction models used to calculate probabilities
+        :param int num_sims: Number of simulation steps to run
+        :param bool increase_prob: Artificially increase probabilities by 100x, defaults to False
+        :param int seed: Seed for the random number generator, defaults to None
+        :param PathLike checkpoint: Path that the run state is periodically saved to, defaults to None
+        :param int checkpoint_every: Number of steps between checkpoints, defaults to 10
+        :param PathLike resume_from: Checkpoint to continue an interrupted run from, defaults to None
+        :param PathLike trajectory: Path that infested cities after every step are recorded to, defaults to None
+        :param Monitor monitor: Receives progress, phase timings and RNG draws, defaults to a progress bar
+        :return DataFrame: OD DataFrame with probability and transition count fields for every model
+        """
+        monitor = ProgressMonitor() if monitor is None else monitor
+        monitor.start(", ".join(models), num_sims)
+
+        # Calculate Probabilities
+        with monitor.phase("probability"):
+            fields = [self._calculate_probability(m, increase_prob) for m in models]
+            probability = np.stack(
+                [
+                    self.graph.to_edges(
+                        self.df[probability_field].to_numpy(dtype=float)
+                    )
+                    for probability_field, _ in fields
+                ]
+            )
 
         # Run Simulations
-        for i in tqdm(range(num_sims)):
-            self._run_single_sim(
-                probability_field, transition_cnt_field, starting_presence
+        transition_cnt, presence = self._run_numpy_sims(
+            models,
+            probability,
+            num_sims,
+            np.random.default_rng(seed),
+            checkpoint,
+            checkpoint_every,
+            resume_from,
+            trajectory,
+            monitor,
+        )
+
+        # Write Transition Counts to DataFrame
+        with monitor.phase("aggregation"):
+            for (_, transition_cnt_field), cnt in zip(fields, transition_cnt):
+                self.df[transition_cnt_field] = self.graph.to_rows(cnt)
+
+        monitor.finish()
+
+        # Return
+        return self.df
+
+    def analytic(
+        self, model: str, num_sims: int, increase_prob=False, tol=1e-12
+    ) -> DataFrame:
+        """Approximates expected transition counts by propagating presence probability.
+
+        Instead of sampling, the probability that each city holds BMSB is pushed
+        through the OD graph one step at a time, treating the presence of different
+        cities as independent after the first step. The result is a biased
+        approximation, so it is written to "Approximate" fields rather than the
+        transition count field of `monte_carlo`. Propagation stops early once
+        presence probabilities change by less than `tol`, after which every
+        remaining step adds the same approximate transitions.
+
+        :param str model: Spatial interaction model used to calculate probabilities
+        :param int num_sims: Number of simulation steps
+        :param bool increase_prob: Artificially increase probabilities by 100x, defaults to False
+        :param float tol: Change in presence probabilities treated as converged, defaults to 1e-12
+        :return DataFrame: OD DataFrame with approximate transition counts and destination infestation probability
+        """
+        # Calculate Probabilities
+        probability_field, transition_cnt_field = self._calculate_probability(
+            model, increase_prob
+        )
+        graph = self.graph
+        probability = np.clip(
+            graph.to_edges(self.df[probability_field].to_numpy(dtype=float)), 0, 1
+        )
+        starting_presence, end_presence = self.initial_presence()
+
+        # Probability of Presence & of Having Received BMSB, by City
+        presence = starting_presence.astype(float)
+        infested = end_presence.astype(float)
+        transition_cnt = np.zeros(graph.num_edges)
+
+        for i in range(num_sims):
+            # Expected Transitions along Each Edge
+            transferred = presence[graph.origins] * probability
+            transition_cnt += transferred
+
+            # Probability that No Incoming Edge Fires, Summed in Log Space per City
+            with np.errstate(divide="ignore"):
+                escaped = np.exp(graph.incoming(np.log1p(-transferred)))
+            next_infested = 1 - (1 - infested) * escaped
+
+            # New Presence, Falling Back to Initial Presence if No Origin is Infested
+            extinct = np.prod(1 - next_infested[graph.has_origin])
+            next_presence = np.minimum(next_infested + extinct * starting_presence, 1)
+
+            converged = (
+                np.abs(next_presence - presence).max(initial=0) < tol
+                and np.abs(next_infested - infested).max(initial=0) < tol
+            )
+            presence = next_presence
+            infested = next_infested
+
+            # Remaining Steps Repeat the Same Expected Transitions
+            if converged:
+                transition_cnt += (num_sims - i - 1) * presence[
+                    graph.origins
+                ] * probability
+                break
+
+        # Write Results to Approximate Fields, Leaving Monte Carlo Counts Untouched
+        self.df[
+            transition_cnt_field.replace(
+                "Transition Count", "Approximate Transition Count"
+            )
+        ] = graph.to_rows(transition_cnt)
+        self.df[
+            transition_cnt_field.replace(
+                "Transition Count", "Approximate Infestation Probability"
             )
+        ] = infested[graph.to_codes]
 
         # Return
         return self.df
 
-    def _run_single_sim(
-        self, probability_field: str, transition_cnt_field: str, starting_presence: List
+    def monte_carlo_batch(
+        self,
+        model: str,
+        num_sims: int,
+        replicates: int,
+        increase_prob=False,
+        batch_size=64,
+        seed=None,
+        workers=1,
+        trajectory: PathLike = None,
+        monitor: Monitor = None,
+    ) -> BatchResult:
+        """Runs independent replicates of the simulation, advancing a batch of them together.
+
+        Each replicate is a separate chain of `num_sims` steps, equivalent to one call
+        of `monte_carlo`. Presence is held as a (replicates x cities) matrix and a
+        single block of random numbers is drawn for each step of a batch.
+
+        Every replicate draws from its own stream derived from `seed`, so for a
+        given seed the counts are identical whatever the batch size or number of
+        workers that batches are sharded across.
+
+        :param str model: Spatial interaction model used to calculate probabilities
+        :param int num_sims: Number of simulation steps run by each replicate
+        :param int replicates: Number of independent replicates
+        :param bool increase_prob: Artificially increase probabilities by 100x, defaults to False
+        :param int batch_size: Number of replicates advanced together, defaults to 64
+        :param int seed: Seed that replicate streams are derived from, defaults to None
+        :param int workers: Number of worker processes (None for all cores), defaults to 1
+        :param PathLike trajectory: Path that infested cities after every step are recorded to, defaults to None
+        :param Monitor monitor: Receives progress, phase timings and RNG draws, summed across workers, defaults to a progress bar
+        :return BatchResult: Per-replicate and pooled transition counts
+        """
+        monitor = ProgressMonitor() if monitor is None else monitor
+        monitor.start(model, replicates * num_sims)
+
+        # Calculate Probabilities
+        with monitor.phase("probability"):
+            graph = self.graph
+            probability = self._edge_probability(model, increase_prob)
+        starting_presence, end_presence = self.initial_presence()
+
+        num_cities = graph.num_cities
+
+        transition_cnt = np.zeros(graph.num_edges, dtype=np.int64)
+        incoming = np.zeros((replicates, num_cities), dtype=np.int32)
+        outgoing = np.zeros((replicates, num_cities), dtype=np.int32)
+
+        # Give Every Replicate its Own Stream so Results don't Depend on Sharding
+        seeds = np.random.SeedSequence(seed).spawn(replicates)
+        batches = [
+            (start, min(start + batch_size, replicates))
+            for start in range(0, replicates, batch_size)
+        ]
+        # Create Trajectory File that Each Batch Writes its Own Rows to
+        if trajectory is not None:
+            Trajectory.create(
+                trajectory, replicates, num_sims, graph.cities, graph.names
+            )
+
+        args = (
+            graph,
+            probability,
+            starting_presence,
+            end_presence,
+            num_sims,
+            trajectory,
+            self.backend,
+        )
+        tasks = [(start, seeds[start:stop]) for start, stop in batches]
+
+        if workers == 1:
+            results = (_run_batch(*args, *task) for task in tasks)
+            self._merge_batches(
+                batches, results, transition_cnt, incoming, outgoing, monitor
+            )
+
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=args
+            ) as executor:
+                results = executor.map(_run_worker_batch, tasks)
+                self._merge_batches(
+                    batches, results, transition_cnt, incoming, outgoing, monitor
+                )
+
+        # Order Pooled Counts as the Table's Rows
+        with monitor.phase("aggregation"):
+            transition_cnt = graph.to_rows(transition_cnt)
+
+        monitor.finish()
+
+        return BatchResult(
+            graph.cities, graph.names, transition_cnt, incoming, outgoing
+        )
+
+    def monte_carlo_adaptive(
+        self,
+        model: str,
+        num_sims: int,
+        tol: float,
+        max_replicates=10000,
+        confidence=0.95,
+        increase_prob=False,
+        batch_size=64,
+        seed=None,
+        workers=1,
+        monitor: Monitor = None,
+    ) -> AdaptiveResult:
+        """Runs replicates until per-city Incoming/Outgoing estimates converge.
+
+        Replicates are run in batches as in `monte_carlo_batch` and folded into running
+        means and variances. The run stops after the first batch at which every city's
+        confidence interval half-width is below `tol`, or once `max_replicates` have
+        been run. Batches are merged in replicate order, so for a given seed the
+        stopping point and counts don't depend on the number of workers.
+
+        :param str model: Spatial interaction model used to calculate probabilities
+        :param int num_sims: Number of simulation steps run by each replicate
+        :param float tol: Largest acceptable confidence interval half-width
+        :param int max_replicates: Largest number of replicates to run, defaults to 10000
+        :param float confidence: Confidence level of the intervals, defaults to 0.95
+        :param bool increase_prob: Artificially increase probabilities by 100x, defaults to False
+        :param int batch_size: Number of replicates advanced together, defaults to 64
+        :param int seed: Seed that replicate streams are derived from, defaults to None
+        :param int workers: Number of worker processes (None for all cores), defaults to 1
+        :param Monitor monitor: Receives progress, phase timings and RNG draws, summed across workers, defaults to a progress bar
+        :return AdaptiveResult: Pooled counts, running moments and convergence status
+        """
+        monitor = ProgressMonitor() if monitor is None else monitor
+        monitor.start(model, max_replicates * num_sims)
+
+        # Calculate Probabilities
+        with monitor.phase("probability"):
+            graph = self.graph
+            probability = self._edge_probability(model, increase_prob)
+        starting_presence, end_presence = self.initial_presence()
+        args = (
+            graph,
+            probability,
+            starting_presence,
+            end_presence,
+            num_sims,
+            None,
+            self.backend,
+        )
+
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        seed_sequence = np.random.SeedSequence(seed)
+        transition_cnt = np.zeros(graph.num_edges, dtype=np.int64)
+        incoming = RunningMoments(graph.num_cities)
+        outgoing = RunningMoments(graph.num_cities)
+        converged = False
+
+        # Number of Batches Scheduled at Once
+        executor = None
+        wave_size = 1 if workers == 1 else workers or os.cpu_count()
+
+        try:
+            if workers != 1:
+                executor = ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_worker, initargs=args
+                )
+
+            scheduled = 0
+
+            while scheduled < max_replicates and not converged:
+                # Derive Seeds for the Next Wave of Batches
+                batches = []
+                for i in range(wave_size):
+                    size = min(batch_size, max_replicates - scheduled)
+                    if size <= 0:
+                        break
+
+                    batches.append((scheduled, seed_sequence.spawn(size)))
+                    scheduled += size
+
+                if executor is None:
+                    results = (_run_batch(*args, *task) for task in batches)
+                else:
+                    results = executor.map(_run_worker_batch, batches)
+
+                # Merge Batches in Order & Check Interval Widths after Each
+                for batch_cnt, batch_incoming, batch_outgoing, batch_metrics in results:
+                    with monitor.phase("aggregation"):
+                        transition_cnt += batch_cnt
+                        incoming.update(batch_incoming)
+                        outgoing.update(batch_outgoing)
+                        converged = (
+                            incoming.count > 1
+                            and incoming.half_width(z).max(initial=0) < tol
+                            and outgoing.half_width(z).max(initial=0) < tol
+                        )
+
+                    _report_batch(monitor, batch_metrics)
+
+                    if converged:
+                        break
+
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        # Order Pooled Counts as the Table's Rows
+        with monitor.phase("aggregation"):
+            transition_cnt = graph.to_rows(transition_cnt)
+
+        monitor.finish()
+
+        return AdaptiveResult(
+            graph.cities,
+            graph.names,
+            transition_cnt,
+            incoming,
+            outgoing,
+            z,
+            converged,
+        )
+
+    @staticmethod
+    def _merge_batches(
+        batches: List[Tuple[int, int]],
+        results,
+        transition_cnt: ndarray,
+        incoming: ndarray,
+        outgoing: ndarray,
+        monitor: Monitor,
     ) -> None:
+        # Merge Counts as Batches Complete
+        for (start, stop), batch in zip(batches, results):
+            batch_cnt, batch_incoming, batch_outgoing, batch_metrics = batch
+
+            with monitor.phase("aggregation"):
+                transition_cnt += batch_cnt
+                incoming[start:stop] = batch_incoming
+                outgoing[start:stop] = batch_outgoing
+
+            _report_batch(monitor, batch_metrics)
+
+    def _calculate_probability(self, model: str, increase_prob: bool) -> Tuple[str, str]:
+        # Probability Fields
+        probability_numerator, probability_field, transition_cnt_field = model_fields(
+            model
+        )
+
+        # Calculate
+        self.df[probability_numerator] = self._probability_numerator(model, self.df)
+        sum_prob_num = self.df[probability_numerator].sum()
+        self.df[probability_field] = self.df[probability_numerator] / sum_prob_num
+
+        # Artificially Increase Probability by 100x
+        if increase_prob:
+            self.df[probability_field] *= 100
+
+        return probability_field, transition_cnt_field
+
+    def _edge_probability(self, model: str, increase_prob: bool) -> ndarray:
+        # Calculate Probabilities as an Array in Edge Order, without Touching the Table
+        model_fields(model)
+        probability_numerator = self._probability_numerator(model, self._table)
+        probability = self.graph.to_edges(
+            probability_numerator / probability_numerator.sum()
+        )
+
+        # Artificially Increase Probability by 100x
+        if increase_prob:
+            probability *= 100
+
+        return probability
+
+    def _probability_numerator(self, model: str, table: DataFrame) -> ndarray:
+        to_w = table[self.to_w_field].to_numpy(dtype=float)
+        dist = table[self.dist_field].to_numpy(dtype=float)
+
+        if model == "HUFF_MODEL":
+            return to_w / dist
+
+        elif model == "HUFF_MODEL_DD":
+            return to_w / (dist**2)
+
+        else:
+            return (to_w * table[self.from_w_field].to_numpy(dtype=float)) / dist
+
+    @property
+    def _table(self) -> DataFrame:
+        # Read from the Working Copy if there is One, Otherwise the Source Table
+        return self._source_df if self._df is None else self._df
+
+    def edge_values(self, field: str) -> ndarray:
+        """Reads a field of the OD table in the edge order of the compiled graph.
+
+        :param str field: Name of the field to read
+        :return ndarray: Values of the field, one per edge
+        """
+        return self.graph.to_edges(self._table[field].to_numpy())
+
+    def initial_presence(self) -> Tuple[ndarray, ndarray]:
+        """Reads the starting presence and end presence of each city from the OD table.
+
+        :return Tuple[ndarray, ndarray]: Starting presence & end presence by city code
+        """
+        graph = self.graph
+        table = self._table
+
+        # Get Initial Presence by City
+        starting_presence = np.zeros(graph.num_cities, dtype=bool)
+        starting_presence[
+            graph.from_codes[table[self.from_presence_field].to_numpy() == 1]
+        ] = True
+
+        # Cities that have Received BMSB (End Presence Accumulates Across Steps)
+        end_presence = np.zeros(graph.num_cities, dtype=bool)
+        end_presence[
+            graph.to_codes[table[self.to_presence_field].to_numpy() == 1]
+        ] = True
+
+        return starting_presence, end_presence
+
+    def _run_single_sim(
+        self,
+        probability_field: str,
+        transition_cnt_field: str,
+        starting_presence: List,
+        rng: Random,
+    ) -> int:
+        draws = 0
+
         # Loop through Rows and Simulate Transfer
         for index, row in self.df.iterrows():
             if row[self.from_presence_field] == 1:
                 # Generate Random Number
-                n = random()
+                n = rng.random()
+                draws += 1
 
                 # Check if n < Probability
                 if n < row[probability_field]:
                     self.df.loc[index, self.to_presence_field] = 1
                     self.df.loc[index, transition_cnt_field] += 1
 
-        # Get List of Cities with End Presence
-        end_presence = list(
-            self.df.loc[self.df[self.to_presence_field] == 1][self.to_id_field]
-        )
-
-        # Reset Starting Presence to 0
-        self.df[self.from_presence_field] = 0
+        # Get Cities with End Presence
+        end_presence = np.zeros(self.graph.num_cities, dtype=bool)
+        end_presence[
+            self.graph.to_codes[self.df[self.to_presence_field].to_numpy() == 1]
+        ] = True
 
         # Set New Starting Presence
-        self.df.loc[
-            self.df[self.from_id_field].isin(end_presence), [self.from_presence_field]
-        ] = 1
+        self.df[self.from_presence_field] = end_presence[
+            self.graph.from_codes
+        ].astype(int)
 
         # If All Values are 0, Reset to Initial Settings
         if (self.df[self.from_presence_field] == 0).all() == True:
             self.df[self.from_presence_field] = starting_presence
+
+        return draws
+
+    def _run_numpy_sims(
+        self,
+        models: List[str],
+        probability: ndarray,
+        num_sims: int,
+        rng: Generator,
+        checkpoint: PathLike = None,
+        checkpoint_every=10,
+        resume_from: PathLike = None,
+        trajectory: PathLike = None,
+        monitor: Monitor = None,
+    ) -> Tuple[ndarray, ndarray]:
+        # Run Chains over the Compiled Graph from the Table's Initial Presence
+        starting_presence, end_presence = self.initial_presence()
+
+        # Continue Recording to an Existing Trajectory when Resuming
+        if trajectory is not None:
+            if resume_from is not None and os.path.exists(trajectory):
+                trajectory = Trajectory(trajectory, "r+")
+            else:
+                trajectory = Trajectory.create(
+                    trajectory,
+                    len(probability),
+                    num_sims,
+                    self.graph.cities,
+                    self.graph.names,
+                )
+
+        return simulate_chains(
+            self.graph,
+            probability,
+            starting_presence,
+            end_presence,
+            num_sims,
+            rng,
+            checkpoint,
+            checkpoint_every,
+            resume_from,
+            models,
+            trajectory=trajectory,
+            backend=self.backend,
+            monitor=monitor,
+        )
+
+
+def compact_od_table(
+    df: DataFrame,
+    dist_field="Distance",
+    from_presence_field="BMSB Presence: From",
+    from_id_field="City: From",
+    from_w_field="W: From",
+    to_presence_field="BMSB Presence: To",
+    to_id_field="City: To",
+    to_w_field="W: To",
+    from_key_field=None,
+    to_key_field=None,
+    keep_other_fields=True,
+) -> DataFrame:
+    """Converts an OD table to compact dtypes that `Simulation` accepts as is.
+
+    Each pair of city fields becomes categoricals sharing one set of categories,
+    in order of first appearance, so cities get the same codes (and a seed gives
+    the same draws per edge) as with the original table. Distances and weights
+    are stored as float32 and presence flags as int8, which shrinks a table of
+    object city names several times over.
+
+    :param DataFrame df: OD table with one row per origin-destination link
+    :param bool keep_other_fields: Keep fields not used by the simulation, defaults to True
+    :return DataFrame: Compact OD table with the same fields and row order
+    """
+    # Fields that Share City Categories
+    city_fields = [(from_id_field, to_id_field)]
+    if from_key_field is not None and to_key_field is not None:
+        city_fields.append((from_key_field, to_key_field))
+
+    columns = {}
+
+    for from_field, to_field in city_fields:
+        codes, cities = pd.factorize(
+            pd.concat([df[from_field], df[to_field]], ignore_index=True)
+        )
+        dtype = pd.CategoricalDtype(cities)
+        columns[from_field] = pd.Categorical.from_codes(codes[: len(df)], dtype=dtype)
+        columns[to_field] = pd.Categorical.from_codes(codes[len(df) :], dtype=dtype)
+
+    for field in [dist_field, from_w_field, to_w_field]:
+        columns[field] = df[field].to_numpy(dtype=np.float32)
+
+    for field in [from_presence_field, to_presence_field]:
+        columns[field] = df[field].to_numpy(dtype=np.int8)
+
+    # Keep Field Order of the Original Table
+    fields = [f for f in df.columns if f in columns or keep_other_fields]
+
+    return pd.DataFrame(
+        {f: columns[f] if f in columns else df[f] for f in fields}, index=df.index
+    )
+
+
+def simulate_chains(
+    graph: ODGraph,
+    probability: ndarray,
+    starting_presence: ndarray,
+    end_presence: ndarray,
+    num_sims: int,
+    rng: Generator,
+    checkpoint: PathLike = None,
+    checkpoint_every=10,
+    resume_from: PathLike = None,
+    models: List[str] = None,
+    trajectory: Trajectory = None,
+    backend="numpy",
+    monitor: Monitor = None,
+) -> Tuple[ndarray, ndarray]:
+    """Array-backed equivalent of repeatedly calling `_run_single_sim`.
+
+    Presence is tracked per city rather than per row, one random number is
+    drawn per edge of the compiled graph for each step and edges without
+    presence at their origin are masked out, so the spread rules are identical
+    to the row-by-row engine. Each row of probabilities is run as its own chain,
+    but all chains are compared against the same random numbers.
+
+    When resuming, the generator, presence, counts and step index are restored
+    from the checkpoint, so the run finishes exactly as an uninterrupted run would.
+    Checkpoints record the models and a fingerprint of the probabilities, and a
+    checkpoint saved by a different run is refused.
+
+    :param ODGraph graph: Compiled OD graph
+    :param ndarray probability: Transition probabilities in edge order, shaped (chains, edges)
+    :param ndarray starting_presence: Initial presence of each city
+    :param ndarray end_presence: Initial end presence of each city
+    :param int num_sims: Number of simulation steps to run
+    :param Generator rng: Random number generator used for the draws
+    :param PathLike checkpoint: Path that the run state is periodically saved to, defaults to None
+    :param int checkpoint_every: Number of steps between checkpoints, defaults to 10
+    :param PathLike resume_from: Checkpoint to continue an interrupted run from, defaults to None
+    :param List[str] models: Models run by the chains, recorded in checkpoints, defaults to None
+    :param Trajectory trajectory: Trajectory that infested cities are recorded to after each step, defaults to None
+    :param str backend: Backend of the step kernel, defaults to "numpy"
+    :param Monitor monitor: Receives progress, phase timings and RNG draws of each step, defaults to None
+    :return Tuple[ndarray, ndarray]: Transition counts per edge & final presence per city, one row per chain
+    """
+    step = get_step(backend)
+    monitor = Monitor() if monitor is None else monitor
+    num_chains = len(probability)
+    presence = np.tile(starting_presence, (num_chains, 1))
+    end_presence = np.tile(end_presence, (num_chains, 1))
+    transition_cnt = np.zeros((num_chains, graph.num_edges), dtype=np.int64)
+    first_step = 0
+
+    # Identify the Run that Checkpoints Belong to
+    models = [] if models is None else list(models)
+    if checkpoint is not None or resume_from is not None:
+        fingerprint = Checkpoint.fingerprint(probability)
+
+    # Restore State from Checkpoint
+    if resume_from is not None:
+        saved = Checkpoint.load(resume_from)
+
+        if saved.models != models:
+            raise ValueError(
+                f"Checkpoint was saved by models {saved.models}, not {models}"
+            )
+
+        if (
+            saved.transition_cnt.shape != transition_cnt.shape
+            or saved.fingerprint != fingerprint
+        ):
+            raise ValueError("Checkpoint does not match the probabilities or OD graph")
+
+        presence = saved.presence
+        end_presence = saved.end_presence
+        transition_cnt = saved.transition_cnt
+        rng = saved.generator()
+        first_step = saved.step
+        monitor.resume(first_step)
+
+    for i in range(first_step, num_sims):
+        # Draw Random Numbers for Every Edge, Shared by All Chains
+        with monitor.phase("sampling"):
+            n = np.broadcast_to(rng.random(graph.num_edges), probability.shape)
+
+        with monitor.phase("propagation"):
+            step(
+                graph.indptr,
+                graph.origins,
+                graph.indices,
+                graph.has_origin,
+                probability,
+                n,
+                presence,
+                end_presence,
+                starting_presence,
+                transition_cnt,
+            )
+
+        with monitor.phase("io"):
+            if trajectory is not None:
+                trajectory.record(i, end_presence)
+
+            # Save State Periodically & after the Final Step
+            if checkpoint is not None and (
+                (i + 1) % checkpoint_every == 0 or i + 1 == num_sims
+            ):
+                if trajectory is not None:
+                    trajectory.flush()
+
+                Checkpoint.capture(
+                    i + 1,
+                    rng,
+                    presence,
+                    end_presence,
+                    transition_cnt,
+                    models,
+                    fingerprint,
+                ).save(checkpoint)
+
+        monitor.advance(1, graph.num_edges)
+
+    if trajectory is not None:
+        trajectory.flush()
+
+    return transition_cnt, presence
+
+
+def _run_batch(
+    graph: ODGraph,
+    probability: ndarray,
+    starting_presence: ndarray,
+    end_presence: ndarray,
+    num_sims: int,
+    trajectory: PathLike,
+    backend: str,
+    start: int,
+    seeds: List[SeedSequence],
+) -> Tuple[ndarray, ndarray, ndarray, MetricsMonitor]:
+    """Advances a batch of replicates together for `num_sims` steps.
+
+    :param ODGraph graph: Compiled OD graph
+    :param ndarray probability: Transition probability of each edge
+    :param ndarray starting_presence: Initial presence of each city
+    :param ndarray end_presence: Initial end presence of each city
+    :param int num_sims: Number of simulation steps run by each replicate
+    :param PathLike trajectory: Trajectory file that infested cities are recorded to, or None
+    :param str backend: Backend of the step kernel
+    :param int start: Index of the first replicate in the batch
+    :param List[SeedSequence] seeds: Seed of each replicate in the batch
+    :return Tuple[ndarray, ndarray, ndarray, MetricsMonitor]: Pooled edge counts, incoming & outgoing counts per replicate
+        and the metrics of the batch
+    """
+    step = get_step(backend)
+    monitor = MetricsMonitor()
+    size = len(seeds)
+    num_edges = graph.num_edges
+    num_cities = graph.num_cities
+    rngs = [np.random.default_rng(s) for s in seeds]
+
+    batch_presence = np.tile(starting_presence, (size, 1))
+    batch_end_presence = np.tile(end_presence, (size, 1))
+    batch_cnt = np.zeros((size, num_edges), dtype=np.int32)
+    batch_probability = np.broadcast_to(probability, (size, num_edges))
+    n = np.empty((size, num_edges))
+
+    if trajectory is not None:
+        trajectory = Trajectory(trajectory, "r+")
+
+    for i in range(num_sims):
+        # Draw One Block of Random Numbers, a Row from Each Replicate's Stream
+        with monitor.phase("sampling"):
+            for r, rng in enumerate(rngs):
+                rng.random(out=n[r])
+
+        with monitor.phase("propagation"):
+            step(
+                graph.indptr,
+                graph.origins,
+                graph.indices,
+                graph.has_origin,
+                batch_probability,
+                n,
+                batch_presence,
+                batch_end_presence,
+                starting_presence,
+                batch_cnt,
+            )
+
+        if trajectory is not None:
+            with monitor.phase("io"):
+                trajectory.record(i, batch_end_presence, start)
+
+        monitor.advance(size, n.size)
+
+    if trajectory is not None:
+        trajectory.flush()
+
+    # Aggregate Counts by Replicate & City
+    with monitor.phase("aggregation"):
+        incoming = np.empty((size, num_cities), dtype=np.int64)
+        outgoing = np.empty((size, num_cities), dtype=np.int64)
+
+        for r in range(size):
+            incoming[r] = graph.incoming(batch_cnt[r])
+            outgoing[r] = graph.outgoing(batch_cnt[r])
+
+    return batch_cnt.sum(axis=0, dtype=np.int64), incoming, outgoing, monitor
+
+
+def _init_worker(*args) -> None:
+    global _worker_args, _worker_warmup
+    _worker_args = args
+
+    # Run One Step so Compilation & First-Touch Costs are not Charged to a Batch
+    start = time.perf_counter()
+    graph, probability, starting_presence, end_presence, _, _, backend = args
+    _run_batch(
+        graph,
+        probability,
+        starting_presence,
+        end_presence,
+        1,
+        None,
+        backend,
+        0,
+        [SeedSequence(0)],
+    )
+    _worker_warmup = time.perf_counter() - start
+
+
+def _run_worker_batch(
+    task: Tuple[int, List[SeedSequence]]
+) -> Tuple[ndarray, ndarray, ndarray, MetricsMonitor]:
+    global _worker_warmup
+    batch = _run_batch(*_worker_args, *task)
+
+    # Report the Worker's Warm-Up along with its First Batch
+    if _worker_warmup:
+        batch[3].add_time("warmup", _worker_warmup)
+        _worker_warmup = 0.0
+
+    return batch
+
+
+def _report_batch(monitor: Monitor, batch_metrics: MetricsMonitor) -> None:
+    # Pass Timings, Steps & Draws Measured in a Batch on to the Run's Monitor
+    for name, seconds in batch_metrics.timings.items():
+        monitor.add_time(name, seconds)
+
+    monitor.advance(batch_metrics.steps, batch_metrics.draws)
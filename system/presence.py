@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Counts BMSB observations within city boundaries without ArcGIS."""
+
+import numpy as np
+import pandas as pd
+
+from numpy import ndarray
+from pandas import DataFrame, Series
+
+try:
+    import shapely
+except ImportError:
+    shapely = None
+
+try:
+    from pyproj import Transformer
+except ImportError:
+    Transformer = None
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+
+def count_points(polygons, x: ndarray, y: ndarray, batch_size=2**16) -> ndarray:
+    """Counts the points intersecting each polygon.
+
+    Polygons are indexed once with an STRtree and points are matched to them in
+    vectorized batches. As with the Point_Count of an ArcGIS spatial join, a
+    point on a shared boundary counts towards every polygon it touches.
+
+    :param polygons: Polygons as shapely geometries or WKT
+    :param ndarray x: X coordinate of each point, in the CRS of the polygons
+    :param ndarray y: Y coordinate of each point, in the CRS of the polygons
+    :param int batch_size: Number of points matched at a time, defaults to 2**16
+    :return ndarray: Number of points intersecting each polygon
+    """
+    if shapely is None:
+        raise ImportError("Counting points requires shapely, install shapely")
+
+    polygons = np.asarray(polygons, dtype=object)
+
+    if len(polygons) and isinstance(polygons[0], str):
+        polygons = shapely.from_wkt(polygons)
+
+    tree = shapely.STRtree(polygons)
+    counts = np.zeros(len(polygons), dtype=np.int64)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Match Points to Polygons a Batch at a Time
+    for start in range(0, len(x), batch_size):
+        stop = start + batch_size
+        points = shapely.points(x[start:stop], y[start:stop])
+        _, matches = tree.query(points, predicate="intersects")
+        counts += np.bincount(matches, minlength=len(polygons))
+
+    return counts
+
+
+def city_presence(
+    geometries: Series,
+    observations: DataFrame,
+    x_field="Longitude",
+    y_field="Latitude",
+    crs=None,
+    observations_crs="EPSG:4326",
+    batch_size=2**16,
+) -> DataFrame:
+    """Counts BMSB observations in each city and flags cities with presence.
+
+    Replaces the ArcGIS spatial join behind `BMSB_Point_Count`, so presence can
+    be rescored after each EDDMaps export, e.g. from the output of
+    `ObservationLoader.transform` or `ObservationLoader.read_columns`.
+
+    :param Series geometries: Boundary of each city, as shapely geometries or WKT, indexed by city
+    :param DataFrame observations: Cleaned BMSB observations
+    :param str x_field: Field holding the longitude of each observation, defaults to "Longitude"
+    :param str y_field: Field holding the latitude of each observation, defaults to "Latitude"
+    :param crs: CRS of the city boundaries (e.g. "EPSG:26915"), defaults to None for the CRS of the observations
+    :param observations_crs: CRS of the observation coordinates, defaults to "EPSG:4326"
+    :param int batch_size: Number of observations matched at a time, defaults to 2**16
+    :return DataFrame: Observation count & presence of each city, indexed like `geometries`
+    """
+    x = observations[x_field].to_numpy(dtype=float)
+    y = observations[y_field].to_numpy(dtype=float)
+
+    # Project Observations to the CRS of the City Boundaries
+    if crs is not None and crs != observations_crs:
+        if Transformer is None:
+            raise ImportError("Reprojecting requires pyproj, install pyproj")
+
+        transformer = Transformer.from_crs(observations_crs, crs, always_xy=True)
+        x, y = transformer.transform(x, y)
+
+    counts = count_points(geometries.to_numpy(dtype=object), x, y, batch_size)
+
+    return pd.DataFrame(
+        {
+            "BMSB: Observation Count": counts,
+            "BMSB: Presence": (counts >= 1).astype(np.int64),
+        },
+        index=geometries.index,
+    )
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""Publishes city-level simulation results to the PostGIS tables behind the API."""
+
+import io
+
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+
+from pandas import DataFrame, Series
+from typing import Dict
+
+from db import Database
+
+try:
+    import shapely
+except ImportError:
+    shapely = None
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+# API Table of Each Model
+TABLES = {
+    "HUFF_MODEL": "huff_model",
+    "HUFF_MODEL_DD": "huff_model_distance_decay",
+    "GRAVITY_MODEL": "gravity_model",
+}
+
+# PostGIS Geometry Types a Table can be Constrained to
+GEOMETRY_TYPES = (
+    "Point",
+    "MultiPoint",
+    "LineString",
+    "MultiLineString",
+    "Polygon",
+    "MultiPolygon",
+    "GeometryCollection",
+    "Geometry",
+)
+
+
+class ResultPublisher:
+    """
+    A class used to bulk load simulation results into the API's PostGIS tables.
+
+    Rows are streamed into a staging table with CSV `COPY`, a chunk at a time,
+    and the staging table is then renamed over the live table. Every table is
+    swapped in the same transaction, so API readers see either the previous
+    results or the new ones and never a partially loaded table.
+
+    Methods
+    -------
+    publish(results, geometries)
+        Replaces the live tables with new city-level results.
+
+    Example
+    -------
+    > publisher = ResultPublisher(Database.initialize_from_env())
+    > hs_df = Simulation(merged_df).monte_carlo_cities("HUFF_MODEL", 100, True, seed=42)
+    > publisher.publish({"HUFF_MODEL": hs_df}, city_gdf.set_index("GNIS_FEATU").centroid)
+    """
+
+    # Columns of the API Tables, as Created by the Original Notebook
+    COLUMNS = {
+        "City": "text",
+        "geom": "geometry({geometry_type}, {srid})",
+        "Incoming": "bigint",
+        "Outgoing": "bigint",
+        "Risk": "double precision",
+    }
+
+    def __init__(
+        self,
+        database: Database,
+        srid=4326,
+        schema="public",
+        chunk_size=50000,
+        geometry_type="Point",
+    ) -> None:
+        """Initializes the ResultPublisher class.
+
+        :param Database database: Database holding the API tables, connected on demand
+        :param int srid: Spatial reference of the geometries, defaults to 4326
+        :param str schema: Schema of the API tables, defaults to "public"
+        :param int chunk_size: Number of rows sent per COPY, defaults to 50000
+        :param str geometry_type: PostGIS type of the geometries, defaults to "Point" as in the notebook
+        """
+        if geometry_type not in GEOMETRY_TYPES:
+            raise ValueError(f"Geometry type must be in {list(GEOMETRY_TYPES)}")
+
+        self.database = database
+        self.srid = srid
+        self.geometry_type = geometry_type
+        self.schema = schema
+        self.chunk_size = chunk_size
+
+    def publish(
+        self, results: Dict[str, DataFrame], geometries: Series
+    ) -> Dict[str, int]:
+        """Replaces the live tables with new city-level results.
+
+        :param Dict[str, DataFrame] results: Model (or table) names mapped to results indexed by city key,
+            with City, Incoming, Outgoing & Risk fields as returned by `Simulation.monte_carlo_cities`
+        :param Series geometries: Geometry of each city indexed by the same keys, as shapely geometries or WKT
+        :return Dict[str, int]: Number of rows published to each table
+        """
+        # Keys Must be Unique, or the Join would Pair Every Duplicate
+        if not geometries.index.is_unique:
+            raise ValueError("Geometries must be indexed by a unique city key")
+
+        geom = self._encode(geometries)
+
+        # Join Results to Geometries by City Key, Keeping Cities with Both
+        tables = {}
+        for name, cities_df in results.items():
+            if not cities_df.index.is_unique:
+                raise ValueError(
+                    f"Results of {name} must be indexed by a unique city key"
+                )
+
+            rows = (
+                cities_df[["City", "Incoming", "Outgoing", "Risk"]]
+                .astype({"Incoming": np.int64, "Outgoing": np.int64})
+                .join(geom, how="inner")
+            )
+            tables[TABLES.get(name, name)] = rows.reset_index(drop=True)[
+                list(self.COLUMNS)
+            ]
+
+        opened = self.database.connection is None
+        if opened:
+            self.database.connect()
+
+        connection = self.database.connection
+
+        try:
+            with connection.cursor() as cursor:
+                # Load Every Staging Table before Swapping Any
+                for table, rows in tables.items():
+                    self._stage(cursor, table, rows)
+
+                for table in tables:
+                    self._swap(cursor, table)
+
+            connection.commit()
+
+        except Exception:
+            # Roll Back so the Live Tables are Untouched
+            connection.rollback()
+            raise
+
+        finally:
+            if opened:
+                self.database.close()
+
+        return {table: len(rows) for table, rows in tables.items()}
+
+    def _encode(self, geometries: Series) -> Series:
+        # Convert Geometries to Text PostGIS Accepts, with the SRID Embedded
+        values = geometries.to_numpy(dtype=object)
+
+        if len(values) and isinstance(values[0], str):
+            encoded = [
+                wkt if wkt.startswith("SRID=") else f"SRID={self.srid};{wkt}"
+                for wkt in values
+            ]
+
+        elif shapely is not None:
+            encoded = shapely.to_wkb(
+                shapely.set_srid(values, self.srid), hex=True, include_srid=True
+            )
+
+        else:
+            raise ValueError("Geometries must be WKT strings when shapely is missing")
+
+        return pd.Series(
+            np.asarray(encoded, dtype=object), index=geometries.index, name="geom"
+        )
+
+    def _stage(self, cursor, table: str, rows: DataFrame) -> None:
+        staging = sql.Identifier(self.schema, f"{table}_staging")
+        columns = sql.SQL(", ").join(
+            sql.SQL("{} {}").format(
+                sql.Identifier(name),
+                sql.SQL(
+                    kind.format(
+                        geometry_type=self.geometry_type, srid=int(self.srid)
+                    )
+                ),
+            )
+            for name, kind in self.COLUMNS.items()
+        )
+
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging))
+        cursor.execute(sql.SQL("CREATE TABLE {} ({})").format(staging, columns))
+
+        # Stream Rows with COPY a Chunk at a Time
+        copy = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+            staging, sql.SQL(", ").join(map(sql.Identifier, self.COLUMNS))
+        )
+
+        for start in range(0, len(rows), self.chunk_size):
+            buffer = io.StringIO()
+            rows.iloc[start : start + self.chunk_size].to_csv(
+                buffer, index=False, header=False
+            )
+            buffer.seek(0)
+            cursor.copy_expert(copy, buffer)
+
+        # Index & Analyze before Readers Can See the Table
+        cursor.execute(
+            sql.SQL("CREATE INDEX {} ON {} USING GIST (geom)").format(
+                sql.Identifier(f"{table}_geom_staging_idx"), staging
+            )
+        )
+        cursor.execute(sql.SQL("ANALYZE {}").format(staging))
+
+    def _swap(self, cursor, table: str) -> None:
+        live = sql.Identifier(self.schema, table)
+        old = sql.Identifier(self.schema, f"{table}_old")
+
+        # Rename the Staging Table over the Live Table
+        cursor.execute(
+            sql.SQL("ALTER TABLE IF EXISTS {} RENAME TO {}").format(
+                live, sql.Identifier(f"{table}_old")
+            )
+        )
+        cursor.execute(
+            sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                sql.Identifier(self.schema, f"{table}_staging"), sql.Identifier(table)
+            )
+        )
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(old))
+        cursor.execute(
+            sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                sql.Identifier(self.schema, f"{table}_geom_staging_idx"),
+                sql.Identifier(f"{table}_geom_idx"),
+            )
+        )
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""Keeps OD graphs on disk and runs the simulation by streaming over them."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from numpy import ndarray
+from numpy.random import Generator
+from os import PathLike
+from pandas import DataFrame
+from typing import Iterable, Iterator, Tuple
+
+from columns import ColumnWriter
+from graph import ODGraph, city_table
+from metrics import Monitor, ProgressMonitor
+from model import model_fields
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+# Edge Columns, Memory-Mapped in Edge Order
+EDGE_COLUMNS = {"indices": np.int32, "distance": np.float64}
+
+
+class EdgeStore:
+    """
+    A class used to store an OD graph on disk as memory-mapped `.npy` columns.
+
+    Edges are sorted by origin as in `ODGraph`, so the edges of a range of
+    origin cities form one contiguous slice of every column. The edge columns
+    (destination code and distance) stay on disk and are read a partition of
+    origins at a time; only per-city arrays (weights, presence and the CSR
+    offsets) are held in memory.
+
+    Methods
+    -------
+    create(path, cities, names, weights, presence, chunks, end_presence, partition_edges)
+        Class method. Writes a store from chunks of links sorted by origin.
+    from_dataframe(path, df, ..., partition_edges)
+        Class method. Writes a store from an OD DataFrame.
+    partitions()
+        Iterates over the partitions as origin and edge ranges.
+    read(name, start, stop)
+        Reads a slice of an edge column.
+
+    Example
+    -------
+    > chunks = iter_links(np.column_stack([x, y]), num_nearest=None, search_distance=500)
+    > store = EdgeStore.create("/path/to/store", ids, names, weights, presence, chunks)
+    > StreamingSimulation(store).monte_carlo_cities("HUFF_MODEL", 100, seed=42)
+    """
+
+    def __init__(self, path: PathLike, partition_edges=2**20) -> None:
+        """Opens an existing store.
+
+        :param PathLike path: Directory holding the store
+        :param int partition_edges: Approximate number of edges read at a time, defaults to 2**20
+        """
+        self.path = path
+        self.partition_edges = partition_edges
+
+        with open(os.path.join(path, "cities.json")) as f:
+            meta = json.load(f)
+
+        self.cities = pd.Index(meta["cities"])
+        self.names = pd.Index(meta["names"])
+
+        # Per-City Arrays are Small Enough to Load
+        self.indptr = np.load(os.path.join(path, "indptr.npy"))
+        self.weights = np.load(os.path.join(path, "weights.npy"))
+        self.presence = np.load(os.path.join(path, "presence.npy"))
+        self.end_presence = np.load(os.path.join(path, "end_presence.npy"))
+        self.has_origin = np.diff(self.indptr) > 0
+
+        # Edge Columns Stay on Disk
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in EDGE_COLUMNS
+        }
+
+    @classmethod
+    def create(
+        cls,
+        path: PathLike,
+        cities,
+        names,
+        weights: ndarray,
+        presence: ndarray,
+        chunks: Iterable[Tuple[ndarray, ndarray, ndarray]],
+        end_presence: ndarray = None,
+        partition_edges=2**20,
+    ) -> EdgeStore:
+        """Writes a store from chunks of links sorted by origin.
+
+        Chunks are appended to disk as they arrive, so the links never need to
+        fit in memory at once. `links.iter_links` produces suitable chunks.
+
+        :param PathLike path: Directory the store is written to
+        :param cities: City identifiers, position is the city code
+        :param names: City names, aligned with `cities`
+        :param ndarray weights: Weight of each city
+        :param ndarray presence: Initial BMSB presence of each city
+        :param Iterable[Tuple[ndarray, ndarray, ndarray]] chunks: Origin codes, destination codes & distances
+        :param ndarray end_presence: Initial end presence of each city, defaults to none
+        :param int partition_edges: Approximate number of edges read at a time, defaults to 2**20
+        :return EdgeStore: Opened store
+        """
+        os.makedirs(path, exist_ok=True)
+        num_cities = len(cities)
+        counts = np.zeros(num_cities, dtype=np.int64)
+        last_origin = 0
+
+        # Append Each Chunk to the Edge Columns
+        with ColumnWriter(path, EDGE_COLUMNS) as writer:
+            for from_codes, to_codes, distance in chunks:
+                if len(from_codes) == 0:
+                    continue
+
+                if from_codes[0] < last_origin or np.any(np.diff(from_codes) < 0):
+                    raise ValueError("Links must be sorted by origin")
+
+                last_origin = from_codes[-1]
+                counts += np.bincount(from_codes, minlength=num_cities)
+
+                writer.append("indices", to_codes)
+                writer.append("distance", distance)
+
+        # Write Per-City Arrays
+        indptr = np.zeros(num_cities + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        if end_presence is None:
+            end_presence = np.zeros(num_cities, dtype=bool)
+
+        np.save(os.path.join(path, "indptr.npy"), indptr)
+        np.save(os.path.join(path, "weights.npy"), np.asarray(weights, dtype=float))
+        np.save(os.path.join(path, "presence.npy"), np.asarray(presence, dtype=bool))
+        np.save(
+            os.path.join(path, "end_presence.npy"), np.asarray(end_presence, dtype=bool)
+        )
+
+        with open(os.path.join(path, "cities.json"), "w") as f:
+            json.dump(
+                {
+                    "cities": pd.Index(cities).tolist(),
+                    "names": pd.Index(names).tolist(),
+                },
+                f,
+            )
+
+        return cls(path, partition_edges)
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        path: PathLike,
+        df: DataFrame,
+        dist_field="Distance",
+        from_presence_field="BMSB Presence: From",
+        from_id_field="City: From",
+        from_w_field="W: From",
+        to_presence_field="BMSB Presence: To",
+        to_id_field="City: To",
+        to_w_field="W: To",
+        from_key_field=None,
+        to_key_field=None,
+        partition_edges=2**20,
+    ) -> EdgeStore:
+        """Writes a store from an OD DataFrame, with the field names of `Simulation`.
+
+        Edges keep the order of `ODGraph`, so for a given seed the streamed engine
+        draws the same random number for each edge as the in-memory engine.
+
+        :param PathLike path: Directory the store is written to
+        :param DataFrame df: OD table with one row per origin-destination link
+        :param int partition_edges: Approximate number of edges read at a time, defaults to 2**20
+        :return EdgeStore: Opened store
+        """
+        graph = ODGraph.from_dataframe(
+            df,
+            from_id_field,
+            to_id_field,
+            from_key_field,
+            to_key_field,
+            [(from_w_field, to_w_field), (from_presence_field, to_presence_field)],
+        )
+
+        # Weights & Presence are Attributes of Cities
+        weights = np.zeros(graph.num_cities)
+        weights[graph.from_codes] = df[from_w_field].to_numpy(dtype=float)
+        weights[graph.to_codes] = df[to_w_field].to_numpy(dtype=float)
+
+        presence = np.zeros(graph.num_cities, dtype=bool)
+        presence[graph.from_codes[df[from_presence_field].to_numpy() == 1]] = True
+
+        end_presence = np.zeros(graph.num_cities, dtype=bool)
+        end_presence[graph.to_codes[df[to_presence_field].to_numpy() == 1]] = True
+
+        chunks = [
+            (
+                graph.origins,
+                graph.indices,
+                graph.to_edges(df[dist_field].to_numpy(dtype=float)),
+            )
+        ]
+
+        return cls.create(
+            path,
+            graph.cities,
+            graph.names,
+            weights,
+            presence,
+            chunks,
+            end_presence,
+            partition_edges,
+        )
+
+    @property
+    def num_cities(self) -> int:
+        """Number of cities in the store."""
+        return len(self.cities)
+
+    @property
+    def num_edges(self) -> int:
+        """Number of edges in the store."""
+        return int(self.indptr[-1])
+
+    def partitions(self) -> Iterator[Tuple[int, int, int, int]]:
+        """Iterates over the partitions as origin and edge ranges.
+
+        Partitions hold whole origins, so a city with more than
+        `partition_edges` outgoing edges forms a partition of its own.
+
+        :return Iterator[Tuple[int, int, int, int]]: First & last origin codes and first & last edges, exclusive
+        """
+        start = 0
+
+        while start < self.num_cities:
+            stop = np.searchsorted(
+                self.indptr, self.indptr[start] + self.partition_edges, side="right"
+            )
+            stop = min(max(stop - 1, start + 1), self.num_cities)
+
+            yield start, stop, int(self.indptr[start]), int(self.indptr[stop])
+            start = stop
+
+    def read(self, name: str, start: int, stop: int) -> ndarray:
+        """Reads a slice of an edge column.
+
+        :param str name: Name of the column, 'indices' or 'distance'
+        :param int start: First edge
+        :param int stop: Last edge, exclusive
+        :return ndarray: Values of the column for the edges
+        """
+        return np.asarray(self.columns[name][start:stop])
+
+
+class StreamingSimulation:
+    """
+    A class used to run the Monte Carlo simulation over an on-disk `EdgeStore`.
+
+    Each step reads the store a partition at a time, so memory use depends on
+    the partition size and the number of cities rather than the number of
+    edges. One random number is drawn per edge in edge order, as in the numpy
+    engine of `Simulation`, and partitions without presence at any origin are
+    skipped by advancing the generator instead of reading them.
+
+    Methods
+    -------
+    probability_total(model)
+        Sums probability numerators over all edges.
+    monte_carlo_cities(model, num_sims, increase_prob, seed, transition_cnt_path, monitor)
+        Runs the simulation and returns city-level results.
+
+    Example
+    -------
+    > sim = StreamingSimulation(EdgeStore("/path/to/store", partition_edges=2**18))
+    > cities_df = sim.monte_carlo_cities("GRAVITY_MODEL", 100, seed=42)
+    """
+
+    def __init__(self, store: EdgeStore) -> None:
+        """Initializes the StreamingSimulation class.
+
+        :param EdgeStore store: Store holding the OD graph
+        """
+        self.store = store
+        self._totals = {}
+
+    def _numerator(self, model: str, c0: int, c1: int, e0: int, e1: int) -> ndarray:
+        # Probability Numerators of a Partition's Edges
+        store = self.store
+        to_w = store.weights[store.read("indices", e0, e1)]
+        dist = store.read("distance", e0, e1)
+
+        if model == "HUFF_MODEL":
+            return to_w / dist
+
+        elif model == "HUFF_MODEL_DD":
+            return to_w / (dist**2)
+
+        else:
+            from_w = np.repeat(store.weights[c0:c1], np.diff(store.indptr[c0 : c1 + 1]))
+            return (to_w * from_w) / dist
+
+    def probability_total(self, model: str) -> float:
+        """Sums probability numerators over all edges, streaming partitions once per model.
+
+        :param str model: Spatial interaction model used to calculate probabilities
+        :return float: Sum used to normalize probabilities
+        """
+        model_fields(model)
+
+        if model not in self._totals:
+            self._totals[model] = sum(
+                self._numerator(model, *partition).sum()
+                for partition in self.store.partitions()
+            )
+
+        return self._totals[model]
+
+    def monte_carlo_cities(
+        self,
+        model: str,
+        num_sims: int,
+        increase_prob=False,
+        seed=None,
+        transition_cnt_path: PathLike = None,
+        monitor: Monitor = None,
+    ) -> DataFrame:
+        """Runs the simulation over the store and returns city-level results.
+
+        :param str model: Spatial interaction model used to calculate probabilities
+        :param int num_sims: Number of simulation steps to run
+        :param bool increase_prob: Artificially increase probabilities by 100x, defaults to False
+        :param int seed: Seed for the random number generator, defaults to None
+        :param PathLike transition_cnt_path: Path of a `.npy` file that per-edge transition counts are written to, defaults to None
+        :param Monitor monitor: Receives progress, phase timings and RNG draws, defaults to a progress bar
+        :return DataFrame: City-level DataFrame of Incoming, Outgoing & Risk
+        """
+        store = self.store
+        num_cities = store.num_cities
+        monitor = ProgressMonitor() if monitor is None else monitor
+        monitor.start(model, num_sims)
+
+        with monitor.phase("probability"):
+            total = self.probability_total(model)
+
+        rng = np.random.default_rng(seed)
+
+        presence = store.presence.copy()
+        end_presence = store.end_presence.copy()
+        incoming = np.zeros(num_cities, dtype=np.int64)
+        outgoing = np.zeros(num_cities, dtype=np.int64)
+
+        transition_cnt = None
+        if transition_cnt_path is not None:
+            transition_cnt = np.lib.format.open_memmap(
+                transition_cnt_path, mode="w+", dtype=np.int32, shape=(store.num_edges,)
+            )
+
+        for i in range(num_sims):
+            for c0, c1, e0, e1 in store.partitions():
+                # Skip the Partition's Draws if None of its Origins has Presence
+                if not presence[c0:c1].any():
+                    _skip(rng, e1 - e0)
+                    monitor.advance(0, e1 - e0)
+                    continue
+
+                with monitor.phase("sampling"):
+                    n = rng.random(e1 - e0)
+
+                with monitor.phase("probability"):
+                    probability = self._numerator(model, c0, c1, e0, e1) / total
+                    if increase_prob:
+                        probability *= 100
+
+                with monitor.phase("propagation"):
+                    origins = np.repeat(
+                        np.arange(c0, c1), np.diff(store.indptr[c0 : c1 + 1])
+                    )
+                    fired = presence[origins] & (n < probability)
+                    destinations = store.read("indices", e0, e1)[fired]
+                    end_presence[destinations] = True
+
+                with monitor.phase("aggregation"):
+                    incoming += np.bincount(destinations, minlength=num_cities)
+                    outgoing[c0:c1] += np.bincount(
+                        origins[fired] - c0, minlength=c1 - c0
+                    )
+
+                    if transition_cnt is not None:
+                        transition_cnt[e0:e1] += fired
+
+                monitor.advance(0, e1 - e0)
+
+            # Set New Starting Presence, Resetting if No Origin has Presence
+            presence = end_presence.copy()
+            if not (presence & store.has_origin).any():
+                presence = store.presence.copy()
+
+            monitor.advance(1)
+
+        if transition_cnt is not None:
+            transition_cnt.flush()
+
+        # Risk is the Sum of Incoming Probabilities before Any Increase
+        with monitor.phase("aggregation"):
+            risk = np.zeros(num_cities)
+            for c0, c1, e0, e1 in store.partitions():
+                risk += np.bincount(
+                    store.read("indices", e0, e1),
+                    weights=self._numerator(model, c0, c1, e0, e1) / total,
+                    minlength=num_cities,
+                )
+
+        monitor.finish()
+
+        return city_table(
+            store.cities,
+            store.names,
+            {"Incoming": incoming, "Outgoing": outgoing, "Risk": risk},
+        )
+
+
+def _skip(rng: Generator, draws: int) -> None:
+    # Advance the Generator as if Draws were Made, Drawing them where Unsupported
+    if hasattr(rng.bit_generator, "advance"):
+        rng.bit_generator.advance(draws)
+    else:
+        for start in range(0, draws, 2**20):
+            rng.random(min(2**20, draws - start))
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""Evaluates the spread simulation over grids of spatial interaction parameters."""
+
+import os
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from numpy import ndarray
+from os import PathLike
+from pandas import DataFrame
+from typing import Dict, List, Tuple
+
+from graph import ODGraph
+from metrics import MetricsMonitor, Monitor, ProgressMonitor
+from model import Simulation, _report_batch, simulate_chains
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+# Arguments Shared by All Parameter Sets Run in a Worker Process
+_worker_args = None
+
+
+class ParameterSweep:
+    """
+    A class used to run the simulation over every combination of model parameters.
+
+    Probabilities take the form W / D^decay * scale, where W is the destination
+    weight, optionally multiplied by the origin weight. The OD arrays are read
+    from the simulation once, and probabilities are normalized once per weight
+    variant and decay exponent, then reused for every scaling factor.
+
+    Methods
+    -------
+    probability(weights, decay)
+        Returns normalized edge probabilities, cached per weight variant & decay.
+    run(num_sims, seed, workers, output_dir)
+        Runs every parameter combination and returns a tidy results table.
+
+    Example
+    -------
+    > sweep = ParameterSweep(Simulation(merged_df), decays=[1, 1.5, 2], scales=[1, 10, 100])
+    > results_df = sweep.run(100, seed=42, workers=8, output_dir="/path/to/sweep")
+    """
+
+    def __init__(
+        self,
+        simulation: Simulation,
+        decays: List[float] = (1, 2),
+        scales: List[float] = (1, 100),
+        weights: Dict[str, Tuple[str, str]] = None,
+    ) -> None:
+        """Initializes the ParameterSweep class.
+
+        :param Simulation simulation: Simulation holding the OD table and compiled graph
+        :param List[float] decays: Distance-decay exponents, defaults to (1, 2)
+        :param List[float] scales: Probability scaling factors, defaults to (1, 100)
+        :param Dict[str, Tuple[str, str]] weights: Weight variants as name: (destination field, origin field or None),
+            defaults to the Huff (destination only) and Gravity (destination x origin) weights
+        """
+        self.simulation = simulation
+        self.decays = list(decays)
+        self.scales = list(scales)
+
+        if weights is None:
+            weights = {
+                "HUFF": (simulation.to_w_field, None),
+                "GRAVITY": (simulation.to_w_field, simulation.from_w_field),
+            }
+
+        self.weights = weights
+
+        # Read Shared OD Arrays Once
+        self.distance = simulation.edge_values(simulation.dist_field).astype(float)
+        self._probability_cache = {}
+
+    def probability(self, weights: str, decay: float) -> ndarray:
+        """Returns normalized edge probabilities, cached per weight variant & decay.
+
+        :param str weights: Name of the weight variant
+        :param float decay: Distance-decay exponent
+        :return ndarray: Probability of each edge, before scaling
+        """
+        key = (weights, decay)
+
+        if key not in self._probability_cache:
+            to_w_field, from_w_field = self.weights[weights]
+            numerator = self.simulation.edge_values(to_w_field).astype(float)
+
+            if from_w_field is not None:
+                numerator = numerator * self.simulation.edge_values(from_w_field)
+
+            numerator = numerator / self.distance**decay
+            self._probability_cache[key] = numerator / numerator.sum()
+
+        return self._probability_cache[key]
+
+    def run(
+        self,
+        num_sims: int,
+        seed=None,
+        workers=1,
+        output_dir: PathLike = None,
+        monitor: Monitor = None,
+    ) -> DataFrame:
+        """Runs every parameter combination and returns a tidy results table.
+
+        Every combination draws from a generator seeded with `seed`, so parameter
+        sets are compared under common random numbers.
+
+        :param int num_sims: Number of simulation steps run for each parameter set
+        :param int seed: Seed for the random number generator, defaults to None
+        :param int workers: Number of worker processes (None for all cores), defaults to 1
+        :param PathLike output_dir: Directory that a CSV per parameter set is written to, defaults to None
+        :param Monitor monitor: Receives progress, phase timings summed across workers and RNG draws,
+            defaults to a progress bar
+        :return DataFrame: One row per parameter set and city with Incoming, Outgoing & Risk
+        """
+        graph = self.simulation.graph
+        starting_presence, end_presence = self.simulation.initial_presence()
+
+        # Use the Same Seed for Every Parameter Set
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+
+        parameter_sets = list(product(self.weights, self.decays, self.scales))
+        monitor = ProgressMonitor() if monitor is None else monitor
+        monitor.start("Parameter Sweep", len(parameter_sets) * num_sims)
+
+        # Normalize Probabilities Once per Weight Variant & Decay
+        with monitor.phase("probability"):
+            probabilities = {
+                (weights, decay): self.probability(weights, decay)
+                for weights, decay in product(self.weights, self.decays)
+            }
+        args = (
+            graph,
+            probabilities,
+            starting_presence,
+            end_presence,
+            num_sims,
+            seed,
+            self.simulation.backend,
+        )
+
+        tables = []
+
+        if workers == 1:
+            results = (_run_parameter_set(*args, p) for p in parameter_sets)
+            self._collect(results, tables, monitor)
+
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=args
+            ) as executor:
+                results = executor.map(_run_worker_parameter_set, parameter_sets)
+                self._collect(results, tables, monitor)
+
+        # Write a Table per Parameter Set
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+            with monitor.phase("io"):
+                for (weights, decay, scale), table in zip(parameter_sets, tables):
+                    table.to_csv(
+                        os.path.join(
+                            output_dir, f"{weights}_decay-{decay}_scale-{scale}.csv"
+                        ),
+                        index=False,
+                    )
+
+        monitor.finish()
+
+        return pd.concat(tables, ignore_index=True)
+
+    @staticmethod
+    def _collect(results, tables: List[DataFrame], monitor: Monitor) -> None:
+        # Gather Tables & Metrics as Parameter Sets Complete
+        for table, table_metrics in results:
+            tables.append(table)
+            _report_batch(monitor, table_metrics)
+
+
+def _run_parameter_set(
+    graph: ODGraph,
+    probabilities: Dict[Tuple[str, float], ndarray],
+    starting_presence: ndarray,
+    end_presence: ndarray,
+    num_sims: int,
+    seed: int,
+    backend: str,
+    parameter_set: Tuple[str, float, float],
+) -> Tuple[DataFrame, MetricsMonitor]:
+    weights, decay, scale = parameter_set
+    probability = probabilities[(weights, decay)]
+    monitor = MetricsMonitor()
+
+    # Run a Single Chain with the Scaled Probabilities
+    transition_cnt, presence = simulate_chains(
+        graph,
+        (probability * scale)[np.newaxis],
+        starting_presence,
+        end_presence,
+        num_sims,
+        np.random.default_rng(seed),
+        backend=backend,
+        monitor=monitor,
+    )
+
+    # Aggregate by City
+    with monitor.phase("aggregation"):
+        table = pd.DataFrame(
+            {
+                "Weights": weights,
+                "Decay": decay,
+                "Scale": scale,
+                "City Key": graph.cities,
+                "City": graph.names,
+                "Incoming": graph.incoming(transition_cnt[0]).astype(np.int64),
+                "Outgoing": graph.outgoing(transition_cnt[0]).astype(np.int64),
+                "Risk": graph.incoming(probability),
+            }
+        )
+
+    return table, monitor
+
+
+def _init_worker(*args) -> None:
+    global _worker_args
+    _worker_args = args
+
+
+def _run_worker_parameter_set(
+    parameter_set: Tuple[str, float, float]
+) -> Tuple[DataFrame, MetricsMonitor]:
+    return _run_parameter_set(*_worker_args, parameter_set)
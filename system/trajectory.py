@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Records and queries step-by-step spread trajectories as packed bitsets."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from numpy import ndarray
+from os import PathLike
+from pandas import Series
+from typing import List
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+# Number of Set Bits in Every Possible Byte
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis], axis=1).sum(
+    axis=1
+)
+
+
+class Trajectory:
+    """
+    A class used to store which cities are infested after every step of every replicate.
+
+    Each step of each replicate is stored as one bit per city in a memory-mapped
+    `.npy` file shaped (replicates, steps, ceil(cities / 8)), with city identifiers
+    and names kept in a JSON file next to it. Replicates can be written by separate processes as
+    long as each writes its own rows.
+
+    Methods
+    -------
+    create(path, replicates, num_sims, cities, names)
+        Class method. Creates an empty trajectory file.
+    record(step, infested, start)
+        Writes the infested cities of a block of replicates after a step.
+    flush()
+        Flushes written steps to disk.
+    infested(replicate, step)
+        Returns the infested cities of a replicate after a step.
+    infested_counts()
+        Counts infested cities for every replicate and step.
+    first_arrival()
+        Finds the first step at which each city is infested in each replicate.
+    first_arrival_distribution(city)
+        Tabulates first arrival steps of a city across replicates.
+
+    Example
+    -------
+    > sim.monte_carlo_batch("HUFF_MODEL", 100, 1000, trajectory="/path/to/run.npy")
+    > trajectory = Trajectory("/path/to/run.npy")
+    > trajectory.first_arrival_distribution(2396471)
+    """
+
+    def __init__(self, path: PathLike, mode="r") -> None:
+        """Opens an existing trajectory file.
+
+        :param PathLike path: Path to the trajectory `.npy` file
+        :param str mode: Memory-map mode, 'r' to query or 'r+' to record, defaults to "r"
+        """
+        self.path = path
+        self.bits = np.load(path, mmap_mode=mode)
+
+        with open(f"{os.fspath(path)}.json") as f:
+            meta = json.load(f)
+
+        # Files Written before Names were Kept Identify Cities by Name
+        self.cities = pd.Index(meta["cities"])
+        self.names = pd.Index(meta.get("names", meta["cities"]))
+
+    @classmethod
+    def create(
+        cls,
+        path: PathLike,
+        replicates: int,
+        num_sims: int,
+        cities: List[str],
+        names: List[str] = None,
+    ) -> Trajectory:
+        """Creates an empty trajectory file.
+
+        :param PathLike path: Path the trajectory `.npy` file is written to
+        :param int replicates: Number of replicates that will be recorded
+        :param int num_sims: Number of steps in each replicate
+        :param List[str] cities: City identifiers, in city code order
+        :param List[str] names: City names aligned with `cities`, defaults to None for the identifiers
+        :return Trajectory: Trajectory opened for recording
+        """
+        num_bytes = -(-len(cities) // 8)
+        bits = np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.uint8, shape=(replicates, num_sims, num_bytes)
+        )
+        bits.flush()
+        del bits
+
+        with open(f"{os.fspath(path)}.json", "w") as f:
+            json.dump(
+                {
+                    "cities": [str(c) for c in cities],
+                    "names": [str(c) for c in (cities if names is None else names)],
+                },
+                f,
+            )
+
+        return cls(path, "r+")
+
+    @property
+    def replicates(self) -> int:
+        """Number of replicates in the trajectory."""
+        return self.bits.shape[0]
+
+    @property
+    def num_sims(self) -> int:
+        """Number of steps in each replicate."""
+        return self.bits.shape[1]
+
+    def record(self, step: int, infested: ndarray, start=0) -> None:
+        """Writes the infested cities of a block of replicates after a step.
+
+        :param int step: Index of the step that was completed
+        :param ndarray infested: Infested cities, shaped (replicates in block, cities)
+        :param int start: Index of the first replicate in the block, defaults to 0
+        """
+        self.bits[start : start + len(infested), step] = np.packbits(infested, axis=1)
+
+    def flush(self) -> None:
+        """Flushes written steps to disk."""
+        self.bits.flush()
+
+    def infested(self, replicate: int, step: int) -> ndarray:
+        """Returns the infested cities of a replicate after a step.
+
+        :param int replicate: Index of the replicate
+        :param int step: Index of the step
+        :return ndarray: Infested flag of each city
+        """
+        return np.unpackbits(self.bits[replicate, step], count=len(self.cities)).astype(
+            bool
+        )
+
+    def infested_counts(self) -> ndarray:
+        """Counts infested cities for every replicate and step.
+
+        :return ndarray: Number of infested cities, shaped (replicates, steps)
+        """
+        counts = np.empty((self.replicates, self.num_sims), dtype=np.int64)
+
+        # Count Bits a Step at a Time to Keep Memory Bounded
+        for step in range(self.num_sims):
+            counts[:, step] = _POPCOUNT[self.bits[:, step]].sum(axis=1)
+
+        return counts
+
+    def first_arrival(self) -> ndarray:
+        """Finds the first step at which each city is infested in each replicate.
+
+        Steps are counted from 1, and cities never infested in a replicate are -1.
+
+        :return ndarray: First arrival step, shaped (replicates, cities)
+        """
+        arrival = np.full((self.replicates, len(self.cities)), -1, dtype=np.int32)
+
+        for step in range(self.num_sims):
+            infested = np.unpackbits(
+                self.bits[:, step], axis=1, count=len(self.cities)
+            ).astype(bool)
+            arrival[infested & (arrival < 0)] = step + 1
+
+        return arrival
+
+    def first_arrival_distribution(self, city) -> Series:
+        """Tabulates first arrival steps of a city across replicates.
+
+        :param city: Identifier of the city, as in `cities`
+        :return Series: Number of replicates by first arrival step (-1 for never)
+        """
+        column = self.cities.get_loc(str(city))
+
+        # Names Identify Cities Only in Older Files, where they may Repeat
+        if not isinstance(column, (int, np.integer)):
+            raise ValueError(f"City '{city}' is not unique, identify it by its key")
+
+        # Read Only the Bit Belonging to the City
+        flags = (self.bits[:, :, column // 8] >> (7 - column % 8)) & 1
+        arrival = np.where(flags.any(axis=1), flags.argmax(axis=1) + 1, -1)
+
+        return pd.Series(arrival).value_counts().sort_index().rename("Replicates")
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""Summarizes DEM and NLCD rasters within city boundaries without ArcGIS."""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from os import PathLike
+from pandas import DataFrame, Series
+from typing import Tuple
+
+try:
+    import rasterio
+    from rasterio.features import rasterize
+    from rasterio.windows import Window, bounds
+    from rasterio.windows import transform as window_transform
+except ImportError:
+    rasterio = None
+
+try:
+    import shapely
+except ImportError:
+    shapely = None
+
+__author__ = "Luke Zaruba"
+__credits__ = ["Luke Zaruba", "Mattie Gisselbeck"]
+__status__ = "Production"
+
+# NLCD Land Cover Classes Reclassified to Urban (1), Agricultural (2) & Natural (3)
+NLCD_CLASSES = {
+    11: 3,
+    21: 1,
+    22: 1,
+    23: 1,
+    24: 1,
+    31: 3,
+    41: 3,
+    42: 3,
+    43: 3,
+    52: 3,
+    71: 3,
+    81: 2,
+    82: 2,
+    90: 3,
+    95: 3,
+}
+
+# Arguments Shared by All Tiles Run in a Worker Process
+_worker_args = None
+
+
+def zonal_histogram(
+    raster: PathLike, geometries: Series, band=1, window_size=1024, workers=1
+) -> DataFrame:
+    """Counts the cells of each value within each zone, a window at a time.
+
+    The raster is split into square windows and only windows intersecting a
+    zone are read. Each zone intersecting a window is rasterized by cell
+    centre over its own extent, so overlapping zones are summarized separately
+    as in ArcGIS, and NoData cells are skipped. Memory is bounded by the window
+    size and the number of distinct values per zone.
+
+    :param PathLike raster: Path to the raster
+    :param Series geometries: Zone polygons in the CRS of the raster, as shapely geometries or WKT,
+        indexed by zone (polygons sharing a label form one zone, e.g. FEATURE_NA)
+    :param int band: Band of the raster summarized, defaults to 1
+    :param int window_size: Width & height of the windows in cells, defaults to 1024
+    :param int workers: Number of worker processes (None for all cores), defaults to 1
+    :return DataFrame: One row per zone & value with the number of cells
+    """
+    if rasterio is None or shapely is None:
+        raise ImportError("Zonal statistics require rasterio & shapely, install both")
+
+    codes, labels = pd.factorize(geometries.index)
+    polygons = geometries.to_numpy(dtype=object)
+
+    if len(polygons) and isinstance(polygons[0], str):
+        polygons = shapely.from_wkt(polygons)
+
+    tree = shapely.STRtree(polygons)
+
+    with rasterio.open(raster) as dataset:
+        height, width, transform = dataset.height, dataset.width, dataset.transform
+
+    # List Windows Intersecting a Zone, with the Zones they Intersect
+    tasks = []
+    for row_off in range(0, height, window_size):
+        for col_off in range(0, width, window_size):
+            window = (
+                col_off,
+                row_off,
+                min(window_size, width - col_off),
+                min(window_size, height - row_off),
+            )
+            extent = shapely.box(*bounds(Window(*window), transform))
+            candidates = tree.query(extent)
+
+            if len(candidates):
+                tasks.append((window, candidates))
+
+    args = (raster, band, polygons, codes)
+
+    if workers == 1:
+        tables = [_tile_histogram(*args, *task) for task in tasks]
+
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=args
+        ) as executor:
+            tables = list(executor.map(_run_worker_tile, tasks))
+
+    # Combine Windows
+    histogram = (
+        pd.concat(
+            [pd.DataFrame({"zone": [], "value": [], "count": []}, dtype=np.int64)]
+            + tables,
+            ignore_index=True,
+        )
+        .groupby(["zone", "value"], as_index=False)["count"]
+        .sum()
+    )
+    histogram["zone"] = labels[histogram["zone"].to_numpy(dtype=np.int64)]
+
+    return histogram
+
+
+def zonal_statistics(histogram: DataFrame) -> DataFrame:
+    """Calculates the statistics of ArcGIS `ZonalStatisticsAsTable` from a zonal histogram.
+
+    STD is the population standard deviation, and MEDIAN is the mean of the two
+    middle cells when a zone has an even number of cells.
+
+    :param DataFrame histogram: Output of `zonal_histogram`
+    :return DataFrame: COUNT, MIN, MAX, RANGE, MEAN, STD & MEDIAN of each zone
+    """
+    histogram = histogram.sort_values(["zone", "value"], kind="stable")
+    histogram = histogram.reset_index(drop=True)
+    value = histogram["value"].to_numpy(dtype=float)
+    count = histogram["count"].to_numpy(dtype=np.int64)
+    grouped = histogram.groupby("zone", sort=False)
+
+    stats = pd.DataFrame({"COUNT": grouped["count"].sum()})
+    stats["MIN"] = grouped["value"].min()
+    stats["MAX"] = grouped["value"].max()
+    stats["RANGE"] = stats["MAX"] - stats["MIN"]
+
+    # Weighted Mean & Population Standard Deviation
+    cells = stats["COUNT"].to_numpy()
+    zone = grouped.ngroup().to_numpy()
+    stats["MEAN"] = np.bincount(zone, value * count) / cells
+    deviation = value - stats["MEAN"].to_numpy()[zone]
+    stats["STD"] = np.sqrt(np.bincount(zone, deviation**2 * count) / cells)
+
+    # Find the Middle Cells from Cumulative Counts
+    cumulative = np.cumsum(count)
+    before = np.concatenate([[0], np.cumsum(cells)[:-1]])
+    lower = np.searchsorted(cumulative, before + (cells - 1) // 2, side="right")
+    upper = np.searchsorted(cumulative, before + cells // 2, side="right")
+    stats["MEDIAN"] = (value[lower] + value[upper]) / 2
+
+    return stats
+
+
+def city_attributes(
+    geometries: Series, dem: PathLike, nlcd: PathLike, window_size=1024, workers=1
+) -> DataFrame:
+    """Calculates the DEM & NLCD attributes of `CityTerritory.csv` for each city.
+
+    NLCD classes are reclassified as in the original Reclassify step, with
+    cells of other classes left out of the counts.
+
+    :param Series geometries: City polygons in the CRS of the rasters, indexed by FEATURE_NA
+    :param PathLike dem: Path to the digital elevation model
+    :param PathLike nlcd: Path to the NLCD land cover raster
+    :param int window_size: Width & height of the windows in cells, defaults to 1024
+    :param int workers: Number of worker processes (None for all cores), defaults to 1
+    :return DataFrame: DEM_RANGE, DEM_MEAN, DEM_STD, DEM_MEDIAN & NLCD class counts of each city
+    """
+    cities = pd.unique(geometries.index)
+
+    # Summarize Elevation
+    dem_stats = zonal_statistics(
+        zonal_histogram(dem, geometries, window_size=window_size, workers=workers)
+    ).reindex(cities)
+
+    # Count Cells of Each Reclassified Land Cover Class
+    land_cover = zonal_histogram(
+        nlcd, geometries, window_size=window_size, workers=workers
+    )
+    land_cover["value"] = land_cover["value"].map(NLCD_CLASSES)
+    land_cover = land_cover.dropna(subset=["value"])
+    class_counts = (
+        land_cover.groupby(["zone", "value"])["count"]
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(index=cities, columns=[1, 2, 3], fill_value=0)
+    )
+
+    # Field Names as in CityTerritory.csv
+    return pd.DataFrame(
+        {
+            "DEM_RANGE": dem_stats["RANGE"],
+            "DEM_MEAN": dem_stats["MEAN"],
+            "DEM_STD": dem_stats["STD"],
+            "DEM_MEDIAN": dem_stats["MEDIAN"],
+            "NCLD_CLASS_1": class_counts[1],
+            "NLCD_CLASS_2": class_counts[2],
+            "NLCD_CLASS_3": class_counts[3],
+        },
+        index=pd.Index(cities, name=geometries.index.name),
+    )
+
+
+def _tile_histogram(
+    raster: PathLike,
+    band: int,
+    polygons,
+    codes,
+    window: Tuple[int, int, int, int],
+    candidates,
+) -> DataFrame:
+    with rasterio.open(raster) as dataset:
+        window = Window(*window)
+        data = dataset.read(band, window=window, masked=True)
+        transform = dataset.window_transform(window)
+
+    valid = ~np.ma.getmaskarray(data)
+    height, width = data.shape
+    zones, values = [], []
+
+    # Rasterize Each Zone over its Own Extent, so Overlapping Zones Each Get their Cells
+    candidates = pd.Series(candidates).groupby(codes[candidates])
+
+    for code, members in candidates:
+        shapes = polygons[members.to_numpy()]
+        left, bottom, right, top = shapely.total_bounds(shapes)
+        col0, row0 = ~transform * (left, top)
+        col1, row1 = ~transform * (right, bottom)
+
+        row0, row1 = sorted((row0, row1))
+        col0, col1 = sorted((col0, col1))
+        row0, col0 = max(int(np.floor(row0)), 0), max(int(np.floor(col0)), 0)
+        row1, col1 = min(int(np.ceil(row1)), height), min(int(np.ceil(col1)), width)
+
+        if row1 <= row0 or col1 <= col0:
+            continue
+
+        extent = Window(col0, row0, col1 - col0, row1 - row0)
+        inside = rasterize(
+            [(shape, 1) for shape in shapes],
+            out_shape=(row1 - row0, col1 - col0),
+            transform=window_transform(extent, transform),
+            fill=0,
+            dtype="uint8",
+        ).astype(bool)
+        inside &= valid[row0:row1, col0:col1]
+
+        values.append(data.data[row0:row1, col0:col1][inside])
+        zones.append(np.full(len(values[-1]), code, dtype=np.int64))
+
+    if not zones:
+        return pd.DataFrame({"zone": [], "value": [], "count": []}, dtype=np.int64)
+
+    return (
+        pd.DataFrame({"zone": np.concatenate(zones), "value": np.concatenate(values)})
+        .value_counts()
+        .rename("count")
+        .reset_index()
+    )
+
+
+def _init_worker(*args) -> None:
+    global _worker_args
+    _worker_args = args
+
+
+def _run_worker_tile(task: Tuple) -> DataFrame:
+    return _tile_histogram(*_worker_args, *task)
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Makes the flat modules of `system` importable from the tests."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "system"))
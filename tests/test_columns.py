@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Checks that columns written a chunk at a time match the joined chunks."""
+
+import os
+
+import numpy as np
+import pytest
+
+from columns import ColumnWriter
+
+DTYPES = {"indices": np.int32, "distance": np.float64, "empty": "datetime64[ns]"}
+
+
+def test_columns_match_joined_chunks(tmp_path, monkeypatch):
+    # Copy in Small Blocks so the Last Block is Partial
+    monkeypatch.setattr(ColumnWriter, "BLOCK_SIZE", 7)
+    rng = np.random.default_rng(4)
+    sizes = [10, 0, 25, 3]
+    indices = [rng.integers(0, 1000, size) for size in sizes]
+    distance = [rng.random(size) for size in sizes]
+
+    with ColumnWriter(tmp_path, DTYPES) as writer:
+        for chunk_indices, chunk_distance in zip(indices, distance):
+            writer.append("indices", chunk_indices)
+            writer.append("distance", chunk_distance)
+
+    assert writer.lengths == {"indices": 38, "distance": 38, "empty": 0}
+    assert sorted(os.listdir(tmp_path)) == [
+        "distance.npy",
+        "empty.npy",
+        "indices.npy",
+    ]
+
+    column = np.load(tmp_path / "indices.npy")
+    assert column.dtype == np.int32
+    np.testing.assert_array_equal(column, np.concatenate(indices))
+    np.testing.assert_array_equal(
+        np.load(tmp_path / "distance.npy"), np.concatenate(distance)
+    )
+    assert np.load(tmp_path / "empty.npy").dtype == np.dtype("datetime64[ns]")
+
+
+def test_failed_write_leaves_no_files(tmp_path):
+    with pytest.raises(RuntimeError):
+        with ColumnWriter(tmp_path, DTYPES) as writer:
+            writer.append("indices", [1, 2, 3])
+            raise RuntimeError
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""Checks weather extraction, caching and accumulation against a local stub server."""
+
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+from etl import ResponseCache, WeatherAccumulator, WeatherLoader
+
+def payload(month: int) -> dict:
+    # Four Days of Values at Three Stations, Varying by Month
+    rng = np.random.default_rng(month)
+    features = []
+
+    for station in range(3):
+        for day in range(1, 5):
+            # One Day Missing Precipitation, which is Counted as None
+            precip = None if (station, day) == (1, 2) else float(rng.uniform(0, 1))
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [-94 + station * 0.1, 45.0],
+                    },
+                    "properties": {
+                        "station": f"S{station}",
+                        "date": f"2022-{month:02d}-{day:02d}",
+                        "max_tmpf": float(rng.uniform(20, 90)),
+                        "min_tmpf": float(rng.uniform(0, 50)),
+                        "precip": precip,
+                        "name": f"Station {station}",
+                    },
+                }
+            )
+
+    return {"type": "FeatureCollection", "features": features}
+
+
+class StubServer:
+    """Serves `payload` by month, with an ETag, optionally failing first requests."""
+
+    def __init__(self, fail_first=False) -> None:
+        self.fail_first = fail_first
+        self.requests = []
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                month = int(parse_qs(urlparse(self.path).query)["month"][0])
+                etag = f'"m{month}"'
+
+                with server.lock:
+                    first = all(m != month for m, _ in server.requests)
+                    server.requests.append((month, self.headers.get("If-None-Match")))
+
+                if server.fail_first and first:
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+
+                body = json.dumps(payload(month)).encode()
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = (
+            f"http://127.0.0.1:{self.httpd.server_address[1]}"
+            "/daily.geojson?network=MN_RWIS&month=_M_&year=_Y_"
+        )
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def months(self):
+        return sorted(month for month, _ in self.requests)
+
+
+@pytest.fixture
+def server():
+    stub = StubServer()
+    yield stub
+    stub.httpd.shutdown()
+
+
+@pytest.fixture
+def failing_server():
+    stub = StubServer(fail_first=True)
+    yield stub
+    stub.httpd.shutdown()
+
+
+def expected_means(months) -> pd.DataFrame:
+    # Average the Stub's Daily Values by Station Directly
+    rows = [f["properties"] for month in months for f in payload(month)["features"]]
+    fields = ["max_tmpf", "min_tmpf", "precip"]
+    rows_df = pd.DataFrame(rows).fillna({"precip": 0.0})
+    return rows_df.groupby("station")[fields].mean()
+
+
+def assert_means(aggregated_df: pd.DataFrame, months) -> None:
+    expected = expected_means(months)
+    pd.testing.assert_frame_equal(
+        aggregated_df[expected.columns].sort_index(),
+        expected,
+        check_names=False,
+    )
+
+
+def set_fetched(cache_dir, month: int, fetched: float) -> None:
+    # Pretend the Stored Copy of a Month was Fetched at Another Time
+    path = os.path.join(cache_dir, f"MN_RWIS_2022-{month:02d}.json")
+
+    with open(path) as f:
+        meta = json.load(f)
+
+    meta["fetched"] = fetched
+
+    with open(path, "w") as f:
+        json.dump(meta, f)
+
+
+def test_multi_month_retries_unavailable_server(failing_server):
+    weather_df = WeatherLoader.multi_month(
+        [4, 5, 6], 2022, backoff=0, base_url=failing_server.url
+    )
+
+    # Every Month Failed Once with a 503 & Succeeded on Retry
+    assert failing_server.months() == [4, 4, 5, 5, 6, 6]
+    assert_means(weather_df, [4, 5, 6])
+
+
+def test_multi_month_gives_up_after_retries(failing_server):
+    with pytest.raises(requests.exceptions.RequestException):
+        WeatherLoader.multi_month(
+            [4], 2022, retries=0, backoff=0, base_url=failing_server.url
+        )
+
+
+def test_cache_serves_settled_months_from_disk(server, tmp_path):
+    cache = ResponseCache(tmp_path, ttl=0)
+    first = WeatherLoader.multi_month([4, 5], 2022, base_url=server.url, cache=cache)
+    second = WeatherLoader.multi_month([4, 5], 2022, base_url=server.url, cache=cache)
+
+    assert server.months() == [4, 5]
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_cache_offline(server, tmp_path):
+    cache = ResponseCache(tmp_path)
+    WeatherLoader.multi_month([4, 5], 2022, base_url=server.url, cache=cache)
+
+    # Stored Months are Served however Old, without the Network
+    set_fetched(tmp_path, 5, datetime(2022, 5, 20).timestamp())
+    offline = ResponseCache(tmp_path, ttl=0, offline=True)
+    weather_df = WeatherLoader.multi_month(
+        [4, 5], 2022, base_url=server.url, cache=offline
+    )
+
+    assert server.months() == [4, 5]
+    assert_means(weather_df, [4, 5])
+
+    # Months Never Stored Cannot be Served Offline
+    with pytest.raises(FileNotFoundError):
+        WeatherLoader.multi_month([6], 2022, base_url=server.url, cache=offline)
+
+
+def test_cache_revalidates_current_month(server, tmp_path):
+    today = date.today()
+    cache = ResponseCache(tmp_path, ttl=0)
+    loader = WeatherLoader(today.month, today.year, base_url=server.url, cache=cache)
+
+    loader.extract()
+    first = loader.df
+    loader.extract()
+
+    # The Second Request Sends the ETag & the Cached Body is Kept on a 304
+    assert server.requests == [(today.month, None), (today.month, f'"m{today.month}"')]
+    pd.testing.assert_frame_equal(loader.df, first)
+
+
+def test_cache_keeps_current_month_fresh_for_ttl(server, tmp_path):
+    today = date.today()
+    cache = ResponseCache(tmp_path, ttl=3600)
+    loader = WeatherLoader(today.month, today.year, base_url=server.url, cache=cache)
+
+    loader.extract()
+    loader.extract()
+
+    assert len(server.requests) == 1
+
+
+def test_cache_revalidates_month_fetched_before_it_ended(server, tmp_path):
+    cache = ResponseCache(tmp_path, ttl=0)
+    loader = WeatherLoader(5, 2022, base_url=server.url, cache=cache)
+    loader.extract()
+
+    # A Copy Fetched Mid-Month is Partial, so it is Revalidated
+    set_fetched(tmp_path, 5, datetime(2022, 5, 20).timestamp())
+    loader.extract()
+    assert server.requests == [(5, None), (5, '"m5"')]
+
+    # Once Revalidated after the Month Settled it is Final
+    loader.extract()
+    assert len(server.requests) == 2
+    assert loader.fetched > time.time() - 60
+
+
+def test_accumulator_refetches_partial_months(server, tmp_path):
+    path = tmp_path / "totals.csv"
+    WeatherLoader.multi_month(
+        [4, 5, 6], 2022, base_url=server.url, accumulator=WeatherAccumulator(path)
+    )
+    assert server.months() == [4, 5, 6]
+
+    # Mark May as Stored while it was in Progress
+    accumulator = WeatherAccumulator(path)
+    accumulator.totals.loc[accumulator.totals["month"] == 5, "fetched"] = datetime(
+        2022, 5, 20
+    ).timestamp()
+    accumulator.save()
+
+    accumulator = WeatherAccumulator(path)
+    assert accumulator.complete_periods() == [(2022, 4), (2022, 6)]
+
+    server.requests.clear()
+    weather_df = WeatherLoader.multi_month(
+        [4, 5, 6], 2022, base_url=server.url, accumulator=accumulator
+    )
+
+    # Only the Partial Month is Fetched Again, & is Complete Afterwards
+    assert server.months() == [5]
+    assert WeatherAccumulator(path).complete_periods() == [
+        (2022, 4),
+        (2022, 5),
+        (2022, 6),
+    ]
+    assert_means(weather_df, [4, 5, 6])
+
+
+def test_accumulator_treats_totals_without_fetch_times_as_partial(server, tmp_path):
+    path = tmp_path / "totals.csv"
+    accumulator = WeatherAccumulator(path)
+    WeatherLoader.multi_month(
+        [4, 5], 2022, base_url=server.url, accumulator=accumulator
+    )
+
+    # Totals Saved before Fetch Times were Recorded
+    accumulator.totals.drop(columns="fetched").to_csv(path, index=False)
+
+    assert WeatherAccumulator(path).complete_periods() == []
+
+    server.requests.clear()
+    WeatherLoader.multi_month(
+        [4, 5], 2022, base_url=server.url, accumulator=WeatherAccumulator(path)
+    )
+    assert server.months() == [4, 5]
+
+
+def test_accumulator_means_match_single_pass(server):
+    accumulator = WeatherAccumulator()
+    WeatherLoader.multi_month(
+        [4, 5, 6], 2022, base_url=server.url, accumulator=accumulator
+    )
+
+    # Seasonal Means Come from Stored Totals without Refetching
+    server.requests.clear()
+    assert_means(accumulator.aggregate(months=[4, 6]), [4, 6])
+    assert server.requests == []
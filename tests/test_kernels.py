@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Checks that every step kernel backend produces identical results."""
+
+import numpy as np
+import pytest
+
+from kernels import _compiled_step, numba_step, numpy_step
+
+# Kernels Compared against `numpy_step`, the Pure Python Loop Always Included
+STEPS = [pytest.param(_compiled_step, id="python")]
+if numba_step is not None:
+    STEPS.append(pytest.param(numba_step, id="numba"))
+else:
+    STEPS.append(
+        pytest.param(None, id="numba", marks=pytest.mark.skip("numba not installed"))
+    )
+
+
+def random_graph(rng, num_cities: int, num_edges: int):
+    # Edges Sorted by Origin, with Some Cities Left without Outgoing Edges
+    origins = np.sort(rng.integers(0, num_cities - num_cities // 4, num_edges))
+    indices = rng.integers(0, num_cities, num_edges)
+    indptr = np.concatenate(
+        [[0], np.cumsum(np.bincount(origins, minlength=num_cities))]
+    )
+    has_origin = np.diff(indptr) > 0
+    return indptr, origins, indices, has_origin
+
+
+def run(step, graph, probability, n, starting_presence, initial):
+    # Run Every Step from the Same Initial State
+    indptr, origins, indices, has_origin = graph
+    presence = initial.copy()
+    end_presence = initial.copy()
+    transition_cnt = np.zeros(probability.shape[1:], dtype=np.int64)
+    states = []
+
+    for i in range(len(n)):
+        step(
+            indptr,
+            origins,
+            indices,
+            has_origin,
+            probability[i],
+            n[i],
+            presence,
+            end_presence,
+            starting_presence,
+            transition_cnt,
+        )
+        states.append((presence.copy(), end_presence.copy(), transition_cnt.copy()))
+
+    return states
+
+
+@pytest.mark.parametrize("step", STEPS)
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("num_chains", [1, 16])
+def test_random_graphs_match_numpy(step, seed, num_chains):
+    rng = np.random.default_rng(seed)
+    num_cities, num_edges, num_steps = 40, 200, 12
+    graph = random_graph(rng, num_cities, num_edges)
+
+    # Low Probabilities, so Chains Die Out & Reset as well as Spread
+    probability = rng.random((num_steps, num_chains, num_edges)) * 0.05
+    n = rng.random((num_steps, num_chains, num_edges))
+    starting_presence = rng.random(num_cities) < 0.1
+
+    # Start Each Chain in One City, Some without Outgoing Edges, so they Reset
+    initial = np.zeros((num_chains, num_cities), dtype=bool)
+    initial[np.arange(num_chains), rng.integers(0, num_cities, num_chains)] = True
+
+    expected = run(numpy_step, graph, probability, n, starting_presence, initial)
+    actual = run(step, graph, probability, n, starting_presence, initial)
+
+    for (presence, end_presence, transition_cnt), (e_pres, e_end, e_cnt) in zip(
+        actual, expected
+    ):
+        np.testing.assert_array_equal(presence, e_pres)
+        np.testing.assert_array_equal(end_presence, e_end)
+        np.testing.assert_array_equal(transition_cnt, e_cnt)
+
+
+@pytest.mark.parametrize("step", [pytest.param(numpy_step, id="numpy"), *STEPS])
+def test_extinct_chains_reset(step):
+    rng = np.random.default_rng(0)
+    num_cities, num_edges = 12, 30
+    indptr, origins, indices, has_origin = random_graph(rng, num_cities, num_edges)
+    origin, sink = np.flatnonzero(has_origin)[0], np.flatnonzero(~has_origin)[0]
+
+    # Initial Presence Only in a City with Outgoing Edges
+    starting_presence = np.zeros(num_cities, dtype=bool)
+    starting_presence[origin] = True
+
+    # Chain 0 Holds the Initial Presence, Chain 1 Only a City without Outgoing Edges
+    presence = np.zeros((2, num_cities), dtype=bool)
+    presence[0, origin] = True
+    presence[1, sink] = True
+    end_presence = presence.copy()
+    transition_cnt = np.zeros((2, num_edges), dtype=np.int64)
+
+    # Every Edge Fires
+    step(
+        indptr,
+        origins,
+        indices,
+        has_origin,
+        np.ones((2, num_edges)),
+        np.zeros((2, num_edges)),
+        presence,
+        end_presence,
+        starting_presence,
+        transition_cnt,
+    )
+
+    # Chain 0 Spreads along the Edges of its Origin
+    spread = starting_presence.copy()
+    spread[indices[indptr[origin] : indptr[origin + 1]]] = True
+    np.testing.assert_array_equal(presence[0], spread)
+    np.testing.assert_array_equal(end_presence[0], spread)
+    assert transition_cnt[0].sum() == indptr[origin + 1] - indptr[origin]
+
+    # Chain 1 has No Origin Left, so it Restarts from the Initial Presence
+    np.testing.assert_array_equal(presence[1], starting_presence)
+    np.testing.assert_array_equal(end_presence[1], np.arange(num_cities) == sink)
+    assert transition_cnt[1].sum() == 0
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Checks generated OD links against a brute-force distance matrix."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from links import UNITS, build_links, iter_links
+
+# Coordinates in Meters & Distances in Miles, as in the Minnesota Tables
+SCALE = UNITS["METERS"] / UNITS["MILES"]
+
+
+@pytest.fixture(scope="module")
+def points():
+    return np.random.default_rng(11).random((60, 2)) * 80000
+
+
+def brute_force(origins, destinations=None, num_nearest=100, search_distance=None):
+    # Link Each Origin by Scanning its Row of the Full Distance Matrix
+    same = destinations is None
+    destinations = origins if same else destinations
+    distance = np.hypot(
+        origins[:, 0, np.newaxis] - destinations[:, 0],
+        origins[:, 1, np.newaxis] - destinations[:, 1],
+    ) * SCALE
+    links = []
+
+    for i, row in enumerate(distance):
+        order = np.argsort(row, kind="stable")
+        if same:
+            order = order[order != i]
+        if search_distance is not None:
+            order = order[row[order] <= search_distance]
+        if num_nearest is not None:
+            order = order[:num_nearest]
+
+        links.extend((i, j, row[j]) for j in order)
+
+    from_codes, to_codes, distance = zip(*links) if links else ([], [], [])
+    return np.array(from_codes), np.array(to_codes), np.array(distance)
+
+
+def assert_links_equal(actual, expected):
+    from_codes, to_codes, distance = actual
+    assert from_codes.dtype == to_codes.dtype == np.int32
+    np.testing.assert_array_equal(from_codes, expected[0])
+    np.testing.assert_array_equal(to_codes, expected[1])
+    np.testing.assert_allclose(distance, expected[2], rtol=1e-12)
+
+
+@pytest.mark.parametrize(
+    "num_nearest, search_distance",
+    [(5, None), (None, 12.0), (5, 12.0), (5, 8.0), (100, None)],
+    ids=["k-nearest", "radius", "k+radius", "k+tight-radius", "k-above-cities"],
+)
+def test_links_match_brute_force(points, num_nearest, search_distance):
+    expected = brute_force(points, None, num_nearest, search_distance)
+    actual = build_links(
+        points, num_nearest=num_nearest, search_distance=search_distance
+    )
+
+    # No Origin is Linked to Itself & None Gets More than num_nearest
+    assert not (actual[0] == actual[1]).any()
+    if num_nearest is not None:
+        assert np.bincount(actual[0]).max() <= num_nearest
+
+    assert_links_equal(actual, expected)
+
+
+@pytest.mark.parametrize("num_nearest, search_distance", [(5, None), (None, 12.0)])
+def test_links_to_separate_destinations(points, num_nearest, search_distance):
+    origins, destinations = points[:25], points[25:]
+    expected = brute_force(origins, destinations, num_nearest, search_distance)
+    actual = build_links(
+        origins,
+        destinations,
+        num_nearest=num_nearest,
+        search_distance=search_distance,
+    )
+
+    assert_links_equal(actual, expected)
+
+
+@pytest.mark.parametrize("num_nearest, search_distance", [(5, 12.0), (None, 12.0)])
+def test_chunks_join_to_single_pass(points, num_nearest, search_distance):
+    kwargs = dict(num_nearest=num_nearest, search_distance=search_distance)
+    chunks = list(iter_links(points, chunk_size=7, **kwargs))
+
+    # Each Chunk Covers its Own Origins
+    assert len(chunks) == 9
+    for i, (from_codes, _, _) in enumerate(chunks):
+        assert ((from_codes >= i * 7) & (from_codes < (i + 1) * 7)).all()
+
+    joined = tuple(np.concatenate(arrays) for arrays in zip(*chunks))
+    assert_links_equal(joined, brute_force(points, None, **kwargs))
+
+
+@pytest.mark.parametrize("num_nearest", [1, None])
+def test_links_keep_destinations_at_search_distance(num_nearest):
+    # A Destination Exactly at the Search Distance is Linked, One Beyond is Not
+    points = np.array([[0.0, 0.0], [3.0, 0.0], [0.0, np.nextafter(3.0, np.inf)]])
+    from_codes, to_codes, distance = build_links(
+        points[:1],
+        points[1:],
+        num_nearest=num_nearest,
+        search_distance=3.0,
+        distance_unit="METERS",
+    )
+
+    np.testing.assert_array_equal(from_codes, [0])
+    np.testing.assert_array_equal(to_codes, [0])
+    np.testing.assert_array_equal(distance, [3.0])
+
+
+def test_links_without_neighbours_are_empty(points):
+    from_codes, to_codes, distance = build_links(points, search_distance=1e-6)
+
+    assert len(from_codes) == len(to_codes) == len(distance) == 0
+    assert from_codes.dtype == np.int32
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Checks the simulation engines against each other and against their guarantees."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import synthetic_od
+from metrics import Monitor
+from model import MODEL_FIELDS, Simulation
+
+
+@pytest.fixture(scope="module")
+def od_df():
+    return synthetic_od(80, 10, seed=3, presence_rate=0.05)
+
+
+@pytest.mark.parametrize("increase_prob", [True, False])
+def test_monte_carlo_multi_matches_separate_runs(od_df, increase_prob):
+    multi_df = Simulation(od_df).monte_carlo_multi(
+        list(MODEL_FIELDS), 30, increase_prob, seed=5, monitor=Monitor()
+    )
+
+    # Each Model's Chain Sees the Same Draws as a Separate Run with the Seed
+    for model, (_, probability_field, transition_cnt_field) in MODEL_FIELDS.items():
+        single_df = Simulation(od_df).monte_carlo(
+            model, 30, increase_prob, "numpy", seed=5, monitor=Monitor()
+        )
+
+        pd.testing.assert_series_equal(
+            multi_df[probability_field], single_df[probability_field]
+        )
+        pd.testing.assert_series_equal(
+            multi_df[transition_cnt_field], single_df[transition_cnt_field]
+        )
+
+
+def test_monte_carlo_multi_spreads(od_df):
+    multi_df = Simulation(od_df).monte_carlo_multi(
+        list(MODEL_FIELDS), 30, True, seed=5, monitor=Monitor()
+    )
+
+    # Guard against Comparing Runs in which Nothing Moved
+    for _, _, transition_cnt_field in MODEL_FIELDS.values():
+        assert multi_df[transition_cnt_field].sum() > 0
+
+
+def test_cities_sharing_a_name_need_key_fields(od_df):
+    keyed_df = od_df.assign(
+        ORIG_FID=od_df["City: From"].str[5:].astype(int),
+        DEST_FID=od_df["City: To"].str[5:].astype(int),
+    )
+    city_fields = ["City: From", "City: To"]
+    keyed_df[city_fields] = keyed_df[city_fields].replace("City 1", "City 0")
+
+    # Two Cities Named Alike with Different Weights are not Merged Silently
+    with pytest.raises(ValueError, match="conflicting 'W: From'"):
+        Simulation(keyed_df)
+
+    sim = Simulation(keyed_df, from_key_field="ORIG_FID", to_key_field="DEST_FID")
+    assert sim.graph.num_cities == 80
+    assert (sim.graph.names == "City 0").sum() == 2
+
+
+def test_monte_carlo_batch_independent_of_sharding(od_df):
+    sim = Simulation(od_df)
+    serial = sim.monte_carlo_batch(
+        "HUFF_MODEL", 6, 40, True, batch_size=7, seed=4, monitor=Monitor()
+    )
+    pooled = sim.monte_carlo_batch(
+        "HUFF_MODEL", 6, 40, True, batch_size=16, seed=4, workers=2, monitor=Monitor()
+    )
+
+    assert serial.transition_cnt.sum() > 0
+    np.testing.assert_array_equal(serial.transition_cnt, pooled.transition_cnt)
+    np.testing.assert_array_equal(serial.incoming, pooled.incoming)
+    np.testing.assert_array_equal(serial.outgoing, pooled.outgoing)
+
+
+def test_monte_carlo_adaptive_independent_of_workers(od_df):
+    sim = Simulation(od_df)
+    kwargs = dict(max_replicates=2000, increase_prob=True, batch_size=16, seed=4)
+    serial = sim.monte_carlo_adaptive("HUFF_MODEL", 6, 1.5, **kwargs, monitor=Monitor())
+    pooled = sim.monte_carlo_adaptive(
+        "HUFF_MODEL", 6, 1.5, **kwargs, workers=2, monitor=Monitor()
+    )
+
+    # Stops at the Same Batch, Midway through the Pooled Run's Last Wave
+    assert serial.converged and pooled.converged
+    assert serial.incoming.count == pooled.incoming.count == 80
+    np.testing.assert_array_equal(serial.transition_cnt, pooled.transition_cnt)
+    np.testing.assert_array_equal(serial.incoming.mean, pooled.incoming.mean)
+    np.testing.assert_array_equal(serial.outgoing.mean, pooled.outgoing.mean)
+
+
+def test_monte_carlo_cities_resumes_exactly(od_df, tmp_path):
+    path = tmp_path / "run.ckpt.npz"
+    full_df = Simulation(od_df).monte_carlo_cities(
+        "HUFF_MODEL", 30, True, seed=7, monitor=Monitor()
+    )
+
+    # Interrupt after 13 Steps, then Resume in a Fresh Simulation
+    Simulation(od_df).monte_carlo_cities(
+        "HUFF_MODEL", 13, True, seed=7, checkpoint=path, monitor=Monitor()
+    )
+    resumed_df = Simulation(od_df).monte_carlo_cities(
+        "HUFF_MODEL", 30, True, seed=7, resume_from=path, monitor=Monitor()
+    )
+
+    assert full_df["Incoming"].sum() > 0
+    pd.testing.assert_frame_equal(resumed_df, full_df)
+
+
+def test_monte_carlo_numpy_resumes_exactly(od_df, tmp_path):
+    path = tmp_path / "run.ckpt.npz"
+    full_df = Simulation(od_df).monte_carlo(
+        "GRAVITY_MODEL", 30, True, "numpy", seed=7, monitor=Monitor()
+    )
+
+    Simulation(od_df).monte_carlo(
+        "GRAVITY_MODEL", 13, True, "numpy", seed=7, checkpoint=path, monitor=Monitor()
+    )
+    resumed_df = Simulation(od_df).monte_carlo(
+        "GRAVITY_MODEL", 30, True, "numpy", seed=7, resume_from=path, monitor=Monitor()
+    )
+
+    pd.testing.assert_frame_equal(resumed_df, full_df)
+
+
+def test_resume_refuses_checkpoint_of_another_run(od_df, tmp_path):
+    path = tmp_path / "run.ckpt.npz"
+    sim = Simulation(od_df)
+    sim.monte_carlo_cities(
+        "HUFF_MODEL", 13, True, seed=7, checkpoint=path, monitor=Monitor()
+    )
+
+    with pytest.raises(ValueError, match="saved by models"):
+        sim.monte_carlo_cities(
+            "HUFF_MODEL_DD", 30, True, seed=7, resume_from=path, monitor=Monitor()
+        )
+
+    with pytest.raises(ValueError, match="probabilities"):
+        sim.monte_carlo_cities(
+            "HUFF_MODEL", 30, False, seed=7, resume_from=path, monitor=Monitor()
+        )
+
+
+def test_numpy_engine_matches_pandas_engine_in_distribution():
+    small_df = synthetic_od(30, 3, seed=2, presence_rate=0.2)
+    transition_cnt_field = MODEL_FIELDS["HUFF_MODEL"][2]
+
+    def totals(engine: str) -> np.ndarray:
+        # Runs Update the Table's Presence, so Each Seed gets a Fresh Simulation
+        runs = [
+            Simulation(small_df).monte_carlo(
+                "HUFF_MODEL", 8, True, engine, seed=s, monitor=Monitor()
+            )
+            for s in range(40)
+        ]
+        return np.array([run_df[transition_cnt_field].sum() for run_df in runs])
+
+    # The Engines Draw Differently, so Compare Mean Totals over Seeds
+    numpy_totals, pandas_totals = totals("numpy"), totals("pandas")
+    standard_error = np.hypot(numpy_totals.std(ddof=1), pandas_totals.std(ddof=1))
+    standard_error /= np.sqrt(40)
+
+    assert numpy_totals.mean() > 0
+    assert abs(numpy_totals.mean() - pandas_totals.mean()) < 4 * standard_error
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Checks windowed zonal summaries against masking the whole raster per zone."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+shapely = pytest.importorskip("shapely")
+
+from rasterio.features import geometry_mask
+from rasterio.transform import from_origin
+
+from zonal import zonal_histogram, zonal_statistics
+
+HEIGHT, WIDTH, NODATA = 150, 130, -9999
+TRANSFORM = from_origin(400000, 5000000, 30, 30)
+
+
+@pytest.fixture(scope="module")
+def dem(tmp_path_factory):
+    # Elevations with a Band & Scattered Cells of NoData
+    rng = np.random.default_rng(8)
+    data = rng.integers(900, 1000, (HEIGHT, WIDTH)).astype(np.int16)
+    data[40:46, :] = NODATA
+    data[rng.random((HEIGHT, WIDTH)) < 0.05] = NODATA
+
+    path = tmp_path_factory.mktemp("zonal") / "dem.tif"
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=HEIGHT,
+        width=WIDTH,
+        count=1,
+        dtype=data.dtype,
+        crs="EPSG:26915",
+        transform=TRANSFORM,
+        nodata=NODATA,
+    ) as dataset:
+        dataset.write(data, 1)
+
+    return path, data
+
+
+@pytest.fixture(scope="module")
+def zones():
+    # Overlapping Circles, a Zone of Two Parts, One Cell-Sized & One Off the Raster
+    x, y = 400000, 5000000
+    polygons = {
+        "Lakeville": shapely.Point(x + 1200, y - 1500).buffer(900),
+        "Farmington": shapely.Point(x + 1800, y - 1900).buffer(700),
+        "Saint Anthony": shapely.Point(x + 3000, y - 3500).buffer(400),
+        "Tiny": shapely.box(x + 301, y - 329, x + 329, y - 301),
+        "Outside": shapely.Point(x - 5000, y + 5000).buffer(300),
+    }
+    labels = list(polygons) + ["Saint Anthony"]
+    geometries = list(polygons.values()) + [
+        shapely.Point(x + 500, y - 4000).buffer(350)
+    ]
+
+    return pd.Series(geometries, index=pd.Index(labels, name="FEATURE_NA"))
+
+
+def brute_force(data: np.ndarray, zones: pd.Series) -> pd.DataFrame:
+    # Mask the Whole Raster for Each Zone & Count its Valid Cells
+    rows = []
+
+    for zone, shapes in zones.groupby(level=0, sort=False):
+        inside = ~geometry_mask(shapes, (HEIGHT, WIDTH), TRANSFORM)
+        values, counts = np.unique(
+            data[inside & (data != NODATA)], return_counts=True
+        )
+        rows.extend(zip([zone] * len(values), values, counts))
+
+    return pd.DataFrame(rows, columns=["zone", "value", "count"])
+
+
+def sort_histogram(histogram: pd.DataFrame) -> pd.DataFrame:
+    histogram = histogram.astype({"value": np.int64, "count": np.int64})
+    return histogram.sort_values(["zone", "value"]).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("window_size", [1024, 64, 37])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_zonal_histogram_matches_brute_force(dem, zones, window_size, workers):
+    path, data = dem
+    expected = brute_force(data, zones)
+    histogram = zonal_histogram(
+        path, zones, window_size=window_size, workers=workers
+    )
+
+    # The Cell-Sized Zone is Counted & the Zone Off the Raster is Left Out
+    assert set(expected["zone"]) == {
+        "Lakeville",
+        "Farmington",
+        "Saint Anthony",
+        "Tiny",
+    }
+    pd.testing.assert_frame_equal(sort_histogram(histogram), sort_histogram(expected))
+
+
+def test_zonal_statistics_match_brute_force(dem, zones):
+    path, data = dem
+    stats = zonal_statistics(zonal_histogram(path, zones, window_size=37))
+
+    for zone, shapes in zones.groupby(level=0):
+        inside = ~geometry_mask(shapes, (HEIGHT, WIDTH), TRANSFORM)
+        cells = data[inside & (data != NODATA)].astype(float)
+
+        if not len(cells):
+            assert zone not in stats.index
+            continue
+
+        row = stats.loc[zone]
+        assert row["COUNT"] == len(cells)
+        assert row["MIN"] == cells.min() and row["MAX"] == cells.max()
+        assert row["RANGE"] == cells.max() - cells.min()
+        assert row["MEAN"] == pytest.approx(cells.mean(), rel=1e-12)
+        assert row["STD"] == pytest.approx(cells.std(), rel=1e-9)
+        assert row["MEDIAN"] == np.median(cells)